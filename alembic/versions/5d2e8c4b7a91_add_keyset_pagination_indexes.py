@@ -0,0 +1,30 @@
+"""add keyset pagination indexes
+
+Revision ID: 5d2e8c4b7a91
+Revises: a375188e5f15
+Create Date: 2026-10-18 10:12:31.402117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d2e8c4b7a91'
+down_revision: Union[str, None] = 'a375188e5f15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_conversation_user_id_created_at', 'conversation', ['user_id', 'created_at'], unique=False)
+    op.create_index('ix_message_conversation_id_created_at', 'message', ['conversation_id', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_message_conversation_id_created_at', table_name='message')
+    op.drop_index('ix_conversation_user_id_created_at', table_name='conversation')
@@ -0,0 +1,30 @@
+"""add conversation summary
+
+Revision ID: 8b1f4e6c2d37
+Revises: 5d2e8c4b7a91
+Create Date: 2026-10-18 14:05:12.581904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b1f4e6c2d37'
+down_revision: Union[str, None] = '5d2e8c4b7a91'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('conversation', sa.Column('summary', sa.Text(), nullable=True))
+    op.add_column('conversation', sa.Column('summary_message_count', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('conversation', 'summary_message_count')
+    op.drop_column('conversation', 'summary')
@@ -6,3 +6,56 @@ from dotenv import load_dotenv
 load_dotenv()
 socket.getaddrinfo('localhost', 8080)
 DATABASE_URL = os.getenv("DATABASE_URL")
+
+# "pgbouncer": transaction-pool deployment (e.g. Supabase pooler), no server-side prepared statement cache
+# "direct": direct connection to Postgres
+DB_PROFILE = os.getenv("DB_PROFILE", "pgbouncer")
+DB_PROFILES = {
+    "pgbouncer": {
+        "pool_size": 5,
+        "max_overflow": 5,
+        "pool_timeout": 30,
+        "pool_recycle": 300,
+        "pool_pre_ping": True,
+        "statement_cache_size": 0,
+        "echo": False,
+    },
+    "direct": {
+        "pool_size": 10,
+        "max_overflow": 10,
+        "pool_timeout": 30,
+        "pool_recycle": 1800,
+        "pool_pre_ping": True,
+        "statement_cache_size": 100,
+        "echo": False,
+    },
+}
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    return default if value is None else value.lower() == "true"
+
+
+def load_db_settings() -> dict:
+    """
+    Engine settings of DB_PROFILE, each one can be overridden by environment variable
+    :return: dict of settings
+    """
+    if DB_PROFILE not in DB_PROFILES:
+        raise ValueError(f"Unknown DB_PROFILE: {DB_PROFILE}")
+
+    profile = DB_PROFILES[DB_PROFILE]
+    return {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", profile["pool_size"])),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", profile["max_overflow"])),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", profile["pool_timeout"])),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", profile["pool_recycle"])),
+        "pool_pre_ping": _env_bool("DB_POOL_PRE_PING", profile["pool_pre_ping"]),
+        "statement_cache_size": int(os.getenv("DB_STATEMENT_CACHE_SIZE", profile["statement_cache_size"])),
+        "echo": _env_bool("DB_ECHO", profile["echo"]),
+    }
+
+
+# Whisper API accepts up to 25 MB
+MAX_AUDIO_UPLOAD_BYTES = int(os.getenv("MAX_AUDIO_UPLOAD_BYTES", str(25 * 1024 * 1024)))
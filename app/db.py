@@ -1,9 +1,72 @@
+import time
+
 from fastapi import HTTPException
+from sqlalchemy import make_url
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
-from app.config import DATABASE_URL
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from app.config import DATABASE_URL, DB_PROFILE, load_db_settings
+
+
+class PoolMetrics:
+    """Time spent waiting for a connection from the pool"""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record(self, wait: float):
+        self.checkouts += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+
+    def stats(self) -> dict:
+        pool = engine.pool
+        return {
+            "profile": DB_PROFILE,
+            "size": pool.size(),
+            "checkedOut": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "checkouts": self.checkouts,
+            "avgWaitMs": self.total_wait / self.checkouts * 1000 if self.checkouts else 0.0,
+            "maxWaitMs": self.max_wait * 1000,
+        }
+
+
+pool_metrics = PoolMetrics()
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            pool_metrics.record(time.perf_counter() - start)
+
+
+def create_engine_from_settings(url: str, settings: dict):
+    statement_cache_size = settings["statement_cache_size"]
+    url = make_url(url)
+    if statement_cache_size == 0 and url.get_driver_name() == "asyncpg":
+        # pgbouncer transaction pooling can't keep prepared statements across transactions
+        url = url.update_query_dict({"prepared_statement_cache_size": "0"})
+
+    return create_async_engine(
+        url,
+        echo=settings["echo"],
+        poolclass=InstrumentedQueuePool,
+        pool_size=settings["pool_size"],
+        max_overflow=settings["max_overflow"],
+        pool_timeout=settings["pool_timeout"],
+        pool_recycle=settings["pool_recycle"],
+        pool_pre_ping=settings["pool_pre_ping"],
+        connect_args={"statement_cache_size": statement_cache_size},
+    )
+
 
-engine = create_async_engine(DATABASE_URL, echo=True, connect_args={"statement_cache_size": 0}, pool_pre_ping=True)
+engine = create_engine_from_settings(DATABASE_URL, load_db_settings())
 
 async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 Base = declarative_base()
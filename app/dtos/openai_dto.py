@@ -6,6 +6,8 @@ class ChatRequest(BaseModel):
     message: str
     history: list
     language: str = "ja"
+    # saved conversation the history belongs to. its summary replaces the oldest turns
+    conversationId: str | None = None
 
 
 class TranslateRequest(BaseModel):
@@ -20,3 +22,10 @@ class ChatMessage(TypedDict):
 
 ChatMessages = List[ChatMessage]
 
+
+class ConversationSummary(TypedDict):
+    summary: str
+    # number of oldest messages covered by summary
+    message_count: int
+    # stored messages after those, oldest first
+    recent: ChatMessages
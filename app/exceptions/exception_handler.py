@@ -1,12 +1,14 @@
 from fastapi import Request, HTTPException
 from fastapi.exceptions import RequestValidationError
 from starlette.status import (
-    HTTP_500_INTERNAL_SERVER_ERROR, HTTP_400_BAD_REQUEST, HTTP_401_UNAUTHORIZED, HTTP_404_NOT_FOUND, HTTP_403_FORBIDDEN
+    HTTP_500_INTERNAL_SERVER_ERROR, HTTP_400_BAD_REQUEST, HTTP_401_UNAUTHORIZED, HTTP_404_NOT_FOUND, HTTP_403_FORBIDDEN,
+    HTTP_503_SERVICE_UNAVAILABLE, HTTP_413_REQUEST_ENTITY_TOO_LARGE
 )
 from starlette.exceptions import HTTPException as StarletteHTTPException
 from app.dtos.response_dto import api_response
 from app.exceptions.exceptions import (
-    UserAlreadyExistsException, InvalidCredentialException, NotFoundException, NoAccessConversationException
+    UserAlreadyExistsException, InvalidCredentialException, NotFoundException, NoAccessConversationException,
+    ServiceBusyException, UploadTooLargeException
 )
 
 
@@ -46,6 +48,19 @@ async def custom_http_exception_handler(request: Request, exc: StarletteHTTPExce
             message=str(exc.__context__)
         )
 
+    if isinstance(exc.__context__, ServiceBusyException):
+        return api_response(
+            status=HTTP_503_SERVICE_UNAVAILABLE,
+            message=str(exc.__context__)
+        )
+
+    # raised while the body is parsed, so FastAPI wraps it
+    if isinstance(exc.__context__, UploadTooLargeException):
+        return api_response(
+            status=HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            message=str(exc.__context__)
+        )
+
     return api_response(status=exc.status_code, message=exc.detail, data=None)
 
 
@@ -70,6 +85,12 @@ async def general_exception_handler(request: Request, exc: Exception):
     :param exc:
     :return:
     """
+    if isinstance(exc, ServiceBusyException):
+        return api_response(status=HTTP_503_SERVICE_UNAVAILABLE, message=str(exc), data=None)
+
+    if isinstance(exc, UploadTooLargeException):
+        return api_response(status=HTTP_413_REQUEST_ENTITY_TOO_LARGE, message=str(exc), data=None)
+
     return api_response(status=HTTP_500_INTERNAL_SERVER_ERROR, message=str(exc), data=None)
 
 
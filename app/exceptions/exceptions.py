@@ -21,3 +21,14 @@ class NoAccessConversationException(Exception):
         self.message = message
         super().__init__(self.message)
 
+
+class ServiceBusyException(Exception):
+    def __init__(self, message="Server is busy. Please retry later."):
+        self.message = message
+        super().__init__(self.message)
+
+
+class UploadTooLargeException(Exception):
+    def __init__(self, message="Uploaded file is too large"):
+        self.message = message
+        super().__init__(self.message)
@@ -1,5 +1,7 @@
+import asyncio
 import logging
 import os
+from contextlib import asynccontextmanager
 
 from dotenv import load_dotenv
 from fastapi import FastAPI
@@ -7,17 +9,27 @@ from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.exceptions import HTTPException as StarletteHTTPException
 
+from app.config import MAX_AUDIO_UPLOAD_BYTES
+from app.db import engine
 from app.exceptions.exception_handler import (
     custom_http_exception_handler,
     validation_exception_handler,
     general_exception_handler
 )
+from app.middleware.upload_limit import UploadSizeLimitMiddleware
 from app.routers import websocket_router
 from app.routers.auth_router import AuthController
 from app.routers.history_router import HistoryController
+from app.routers.metrics_router import MetricsController
 from app.routers.openai_router import OpenAIController
 from app.routers.tts_router import TTSController
 from app.routers.user_router import UserController
+from app.service.client_registry import client_registry
+from app.service.context_builder import context_builder
+from app.service.mail_queue_service import mail_queue_service
+from app.service.otp_store import otp_store
+from app.service.realtime_relay import upstream_pool
+from app.utils.executors import executors
 
 load_dotenv()
 
@@ -29,8 +41,32 @@ origins = [
 ]
 logging.info(origins)
 
-app = FastAPI()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await client_registry.start()
+    upstream_pool.start()
+    mail_queue_service.start()
+    # tokenizer data is loaded once here instead of inside the first chat request
+    await asyncio.to_thread(context_builder.warm_up)
+    yield
+    await mail_queue_service.stop()
+    await otp_store.close()
+    await upstream_pool.close()
+    await client_registry.close()
+    await engine.dispose()
+    for executor in executors:
+        executor.shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
+
+# added first so it runs inside CORSMiddleware and its 413 responses get CORS headers
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    max_bytes=MAX_AUDIO_UPLOAD_BYTES,
+    paths=["/api/openai/transcribe", "/api/openai/voice-chat"],
+)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
@@ -55,11 +91,13 @@ auth_controller = AuthController()
 openai_controller = OpenAIController()
 tts_controller = TTSController()
 history_controller = HistoryController()
+metrics_controller = MetricsController()
 # include your routers
 app.include_router(user_controller.router)
 app.include_router(openai_controller.router)
 app.include_router(tts_controller.router)
 app.include_router(history_controller.router)
 app.include_router(auth_controller.router)
+app.include_router(metrics_controller.router)
 app.include_router(websocket_router.router)
 
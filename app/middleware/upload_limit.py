@@ -0,0 +1,42 @@
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.dtos.response_dto import api_response
+from app.exceptions.exceptions import UploadTooLargeException
+
+
+class UploadSizeLimitMiddleware:
+    """
+    Reject request bodies over max_bytes on the given paths before they are read fully.
+    Content-Length is checked up front. Bodies without it (chunked) are counted while they are received.
+    """
+
+    def __init__(self, app: ASGIApp, max_bytes: int, paths: list[str]):
+        self.app = app
+        self.max_bytes = max_bytes
+        self.paths = set(paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        message = f"Uploaded file is too large. Max {self.max_bytes} bytes"
+        content_length = Headers(scope=scope).get("content-length")
+        if content_length and content_length.isdigit() and int(content_length) > self.max_bytes:
+            response = api_response(413, message)
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            request_message = await receive()
+            if request_message["type"] == "http.request":
+                received += len(request_message.get("body", b""))
+                if received > self.max_bytes:
+                    raise UploadTooLargeException(message)
+            return request_message
+
+        await self.app(scope, limited_receive, send)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, ForeignKey
+from sqlalchemy import Column, String, DateTime, ForeignKey, Index, Integer, Text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 import uuid
@@ -14,4 +14,13 @@ class Conversation(Base):
     user_id = Column(UUID(as_uuid=True), ForeignKey("user.id", ondelete="CASCADE"))
     title = Column(String, nullable=True)
     created_at = Column(DateTime, default=datetime.now)
-    messages = relationship("Message", back_populates="conversation")
+    # rolling summary of the oldest summary_message_count messages
+    summary = Column(Text, nullable=True)
+    summary_message_count = Column(Integer, nullable=False, default=0, server_default="0")
+    messages = relationship(
+        "Message", back_populates="conversation", order_by="[Message.created_at, Message.id]"
+    )
+
+    __table_args__ = (
+        Index("ix_conversation_user_id_created_at", "user_id", "created_at"),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, ForeignKey, CheckConstraint
+from sqlalchemy import Column, String, DateTime, ForeignKey, CheckConstraint, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 import uuid
@@ -20,6 +20,7 @@ class Message(Base):
 
     __table_args__ = (
         CheckConstraint("role in ('user', 'assistant')", name="valid_role"),
+        Index("ix_message_conversation_id_created_at", "conversation_id", "created_at"),
     )
 
     conversation = relationship("Conversation", back_populates="messages")
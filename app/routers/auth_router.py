@@ -27,8 +27,8 @@ class AuthController:
             return api_response(200, "success", {"user_id": user_id})
 
         @self.router.post("/mfa")
-        async def mfa(user_id: str, otp: str, db: AsyncSession = Depends(get_db)):
-            token = await self.user_uservice.verify_otp(user_id, otp, db)
+        async def mfa(user_id: str, otp: str):
+            token = await self.user_uservice.verify_otp(user_id, otp)
             data = {"access_token": token, "token_type": "Bearer"}
             return api_response(200, "success", data)
 
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.dtos.history_dto import HistoryCreate, MessagesCreate
@@ -8,6 +8,9 @@ from app.db import get_db
 from app.service.auth_service import get_current_user
 from app.service.history_service import HistoryService
 from app.service.openai_service import OpenAIService
+from app.service.summary_service import summary_service
+
+DEFAULT_PAGE_SIZE = 20
 
 
 class HistoryController:
@@ -15,6 +18,7 @@ class HistoryController:
         self.router = APIRouter(prefix="/api/history")
         self.history_service = HistoryService()
         self.openai_service = OpenAIService()
+        self.summary_service = summary_service
         self._add_routes()
 
     def _add_routes(self):
@@ -34,13 +38,17 @@ class HistoryController:
                 if not data.title:
                     all_texts = [m.content for m in data.messages if m.role == "user"]
                     # ToDo get language setting
-                    auto_title = await self.openai_service.generate_title(all_texts, language="en")
+                    auto_title = await self.openai_service.generate_title(
+                        current_user.preferred_text_model, all_texts, language="en"
+                    )
                     data.title = auto_title
 
-                conversation = await self.history_service.save_conversation(str(current_user.id), data.title, session)
-                await self.history_service.save_messages(data.messages, conversation.id, session)
+                conversation_id = await self.history_service.save_conversation_with_messages(
+                    str(current_user.id), data.title, data.messages, session
+                )
+                self.summary_service.schedule_update(conversation_id)
 
-                return api_response(200, "success", {"conversationId": str(conversation.id)})
+                return api_response(200, "success", {"conversationId": str(conversation_id)})
 
             except Exception as e:
                 await session.rollback()
@@ -48,26 +56,51 @@ class HistoryController:
 
         @self.router.get("/get")
         async def get_user_history(
+                limit: int | None = Query(None, ge=1, le=100),
+                offset: int = Query(0, ge=0),
                 session: AsyncSession = Depends(get_db),
                 current_user: User = Depends(get_current_user)):
-            conversations = await self.history_service.get_user_conversations(str(current_user.id), session)
-            history = await self.history_service.get_history(conversations, session)
+            history = await self.history_service.get_history(str(current_user.id), session, limit, offset)
 
             return api_response(200, "success", history)
 
         @self.router.get("/user-conversations")
         async def get_user_conversations(
                 # user_id: str,
+                limit: int | None = Query(None, ge=1, le=100),
+                cursor: str | None = None,
                 session: AsyncSession = Depends(get_db),
                 current_user: User = Depends(get_current_user)):
+            """
+            Without limit and cursor, return all conversations as a list.
+            Otherwise, return one page: {"items": [...], "nextCursor": ...}
+            """
+            if limit or cursor:
+                page = await self.history_service.get_conversation_page(
+                    str(current_user.id), limit or DEFAULT_PAGE_SIZE, cursor, session
+                )
+                return api_response(200, "success", page)
+
             conversation_list = await self.history_service.get_conversation_list(str(current_user.id), session)
             return api_response(200, "success", conversation_list)
 
         @self.router.get("/conversation-messages")
         async def get_conversation_messages(
                 conversation_id: str,
+                limit: int | None = Query(None, ge=1, le=100),
+                cursor: str | None = None,
                 session: AsyncSession = Depends(get_db),
                 current_user: User = Depends(get_current_user)):
+            """
+            Without limit and cursor, return all messages as a list.
+            Otherwise, return one page: {"items": [...], "nextCursor": ...}
+            """
+            if limit or cursor:
+                page = await self.history_service.get_message_page(
+                    conversation_id, str(current_user.id), limit or DEFAULT_PAGE_SIZE, cursor, session
+                )
+                return api_response(200, "success", page)
+
             message_list = await self.history_service.get_message_list(
                 conversation_id, str(current_user.id), session
             )
@@ -83,6 +116,7 @@ class HistoryController:
                 return api_response(400, "Invalid conversationId")
 
             await self.history_service.save_messages(data.messages, data.conversationId, session)
+            self.summary_service.schedule_update(data.conversationId)
 
             return api_response(200, "success")
 
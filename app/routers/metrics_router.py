@@ -0,0 +1,51 @@
+from fastapi import APIRouter, Depends
+
+from app.db import pool_metrics
+from app.dtos.response_dto import api_response
+from app.models import User
+from app.service.auth_service import get_current_user
+from app.service.context_builder import context_builder
+from app.service.mail_queue_service import mail_queue_service
+from app.service.realtime_relay import echo_metrics, relay_metrics, upstream_pool
+from app.service.translation_cache_service import translation_cache_service
+from app.service.tts_cache_service import tts_cache_service
+from app.utils.executors import executors
+
+
+class MetricsController:
+    def __init__(self):
+        self.router = APIRouter(prefix="/api/metrics")
+        self._add_routes()
+
+    def _add_routes(self):
+        @self.router.get("/tts-cache")
+        def get_tts_cache_metrics(current_user: User = Depends(get_current_user)):
+            return api_response(200, "success", tts_cache_service.stats())
+
+        @self.router.get("/translation-cache")
+        def get_translation_cache_metrics(current_user: User = Depends(get_current_user)):
+            return api_response(200, "success", translation_cache_service.stats())
+
+        @self.router.get("/db-pool")
+        def get_db_pool_metrics(current_user: User = Depends(get_current_user)):
+            return api_response(200, "success", pool_metrics.stats())
+
+        @self.router.get("/executors")
+        def get_executor_metrics(current_user: User = Depends(get_current_user)):
+            return api_response(200, "success", {executor.name: executor.stats() for executor in executors})
+
+        @self.router.get("/realtime")
+        def get_realtime_metrics(current_user: User = Depends(get_current_user)):
+            return api_response(200, "success", {
+                "relay": relay_metrics.stats(),
+                "echo": echo_metrics.stats(),
+                "upstreamPool": upstream_pool.stats()
+            })
+
+        @self.router.get("/mail")
+        def get_mail_metrics(current_user: User = Depends(get_current_user)):
+            return api_response(200, "success", mail_queue_service.stats())
+
+        @self.router.get("/context")
+        def get_context_metrics(current_user: User = Depends(get_current_user)):
+            return api_response(200, "success", context_builder.stats())
@@ -1,22 +1,42 @@
+import json
+
 from fastapi import APIRouter, UploadFile, File, Form, Depends
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.dtos.openai_dto import ChatRequest, TranslateRequest
+from app.db import get_db
+from app.dtos.openai_dto import ChatRequest, TranslateRequest, ConversationSummary
 from app.dtos.response_dto import api_response
 from app.models import User
 from app.service.auth_service import get_current_user
 from app.service.openai_service import OpenAIService
+from app.service.summary_service import summary_service
 
 
 class OpenAIController:
     def __init__(self):
         self.router = APIRouter(prefix="/api/openai")
         self.openai_service = OpenAIService()
+        self.summary_service = summary_service
         self._add_routes()
 
+    async def _get_summary(
+            self,
+            data: ChatRequest,
+            current_user: User,
+            session: AsyncSession) -> ConversationSummary | None:
+        if not data.conversationId or not current_user.use_history:
+            return None
+        return await self.summary_service.get_summary(data.conversationId, str(current_user.id), session)
+
     def _add_routes(self):
         @self.router.post("/chat")
-        async def chat(data: ChatRequest, current_user: User = Depends(get_current_user)):
-            reply = await self.openai_service.chat_with_history(data, current_user)
+        async def chat(
+                data: ChatRequest,
+                session: AsyncSession = Depends(get_db),
+                current_user: User = Depends(get_current_user)):
+            summary = await self._get_summary(data, current_user, session)
+            reply = await self.openai_service.chat_with_history(data, current_user, summary)
             return api_response(200, "success", reply)
 
         @self.router.post("/translate")
@@ -35,11 +55,33 @@ class OpenAIController:
         @self.router.post("/text-chat")
         async def text_chat(
                 payload: ChatRequest,
+                session: AsyncSession = Depends(get_db),
                 current_user: User = Depends(get_current_user)):
 
-            response_data = await self.openai_service.chat_response(payload, current_user)
+            summary = await self._get_summary(payload, current_user, session)
+            response_data = await self.openai_service.chat_response(payload, current_user, summary)
             return api_response(200, "success", response_data)
 
+        @self.router.post("/text-chat/stream")
+        async def text_chat_stream(
+                payload: ChatRequest,
+                session: AsyncSession = Depends(get_db),
+                current_user: User = Depends(get_current_user)):
+            """
+            Stream reply tokens and per-sentence audio as NDJSON
+            :param payload:
+            :param session:
+            :param current_user:
+            :return: StreamingResponse
+            """
+            summary = await self._get_summary(payload, current_user, session)
+
+            async def ndjson():
+                async for event in self.openai_service.chat_stream(payload, current_user, summary):
+                    yield json.dumps(event, ensure_ascii=False) + "\n"
+
+            return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
         @self.router.post("/voice-chat")
         async def voice_chat(
             audio_file: UploadFile = File(...),
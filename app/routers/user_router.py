@@ -31,9 +31,6 @@ class UserController:
             return api_response(200, "success")
 
         @self.router.get("/get-settings")
-        def get_user_settings(
-                db: AsyncSession = Depends(get_db),
-                current_user: User = Depends(get_current_user),
-        ):
+        def get_user_settings(current_user: User = Depends(get_current_user)):
             data = self.user_service.get_user_preferences(current_user)
             return api_response(200, "success", data)
@@ -0,0 +1,178 @@
+import io
+import logging
+import os
+import shutil
+import subprocess
+import wave
+from typing import BinaryIO
+
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+AUDIO_PREPROCESS_ENABLED = os.getenv("AUDIO_PREPROCESS_ENABLED", "false").lower() == "true"
+TARGET_SAMPLE_RATE = 16000
+VAD_FRAME_MS = 20
+# frames quieter than (loudest frame + VAD_THRESHOLD_DB) are silence
+VAD_THRESHOLD_DB = float(os.getenv("VAD_THRESHOLD_DB", "-40"))
+VAD_MIN_THRESHOLD_DB = -60.0
+# keep a little silence around speech so the first and last words are not cut
+VAD_PADDING_MS = int(os.getenv("VAD_PADDING_MS", "200"))
+logger = logging.getLogger(__name__)
+
+
+class AudioPreprocessService:
+    """
+    Shrink audio before transcription: downmix to mono, resample to 16 kHz, trim leading and trailing silence.
+    WAV is decoded natively. Other formats (webm, mp3, ...) are decoded by ffmpeg when it is installed.
+    """
+
+    def decode(self, data: bytes, filename: str) -> tuple[np.ndarray, int] | None:
+        """
+        :param data: encoded audio
+        :param filename:
+        :return: (float32 samples with shape (frames, channels) in [-1, 1], sample rate) or None if not decodable
+        """
+        if filename.lower().endswith(".wav") or data[:4] == b"RIFF":
+            try:
+                return self._decode_wav(data)
+            except (wave.Error, EOFError, ValueError):
+                pass
+        return self._decode_ffmpeg(data)
+
+    def _decode_wav(self, data: bytes) -> tuple[np.ndarray, int]:
+        with wave.open(io.BytesIO(data), "rb") as wav:
+            channels = wav.getnchannels()
+            sample_width = wav.getsampwidth()
+            sample_rate = wav.getframerate()
+            frames = wav.readframes(wav.getnframes())
+
+        if sample_width == 1:
+            samples = (np.frombuffer(frames, dtype=np.uint8).astype(np.float32) - 128) / 128
+        elif sample_width == 2:
+            samples = np.frombuffer(frames, dtype="<i2").astype(np.float32) / 32768
+        elif sample_width == 4:
+            samples = np.frombuffer(frames, dtype="<i4").astype(np.float32) / 2147483648
+        else:
+            raise ValueError(f"Unsupported sample width: {sample_width}")
+        return samples.reshape(-1, channels), sample_rate
+
+    def _decode_ffmpeg(self, data: bytes) -> tuple[np.ndarray, int] | None:
+        if shutil.which("ffmpeg") is None:
+            return None
+        # ffmpeg downmixes and resamples here. numpy steps below then are no-ops
+        result = subprocess.run(
+            ["ffmpeg", "-v", "error", "-i", "pipe:0", "-f", "f32le", "-ac", "1", "-ar", str(TARGET_SAMPLE_RATE), "pipe:1"],
+            input=data,
+            capture_output=True
+        )
+        if result.returncode != 0:
+            logger.warning(f"ffmpeg could not decode audio: {result.stderr.decode(errors='ignore')[:200]}")
+            return None
+        return np.frombuffer(result.stdout, dtype="<f4").reshape(-1, 1), TARGET_SAMPLE_RATE
+
+    def probe_duration(self, file: BinaryIO, filename: str) -> float | None:
+        """
+        Duration without decoding: the WAV header, or ffprobe for other formats when it is installed
+        :param file: encoded audio. the position is reset to 0
+        :param filename:
+        :return: seconds, or None if unknown (e.g. webm from MediaRecorder has no duration in its header)
+        """
+        try:
+            file.seek(0)
+            if filename.lower().endswith(".wav") or file.read(4) == b"RIFF":
+                file.seek(0)
+                try:
+                    with wave.open(file, "rb") as wav:
+                        return wav.getnframes() / wav.getframerate()
+                except (wave.Error, EOFError):
+                    pass
+            if shutil.which("ffprobe") is None:
+                return None
+            file.seek(0)
+            result = subprocess.run(
+                ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "default=nw=1:nk=1", "pipe:0"],
+                input=file.read(),
+                capture_output=True
+            )
+            try:
+                return float(result.stdout.decode().strip())
+            except ValueError:
+                return None
+        finally:
+            file.seek(0)
+
+    def downmix(self, samples: np.ndarray) -> np.ndarray:
+        return samples.mean(axis=1, dtype=np.float32)
+
+    def resample(self, mono: np.ndarray, sample_rate: int, target_rate: int = TARGET_SAMPLE_RATE) -> np.ndarray:
+        if sample_rate == target_rate or len(mono) == 0:
+            return mono
+        ratio = sample_rate / target_rate
+        if ratio > 1:
+            # moving average as a cheap low-pass filter against aliasing
+            width = int(round(ratio))
+            mono = np.convolve(mono, np.ones(width, dtype=np.float32) / width, mode="same")
+        target_length = int(len(mono) / ratio)
+        positions = np.arange(target_length, dtype=np.float64) * ratio
+        return np.interp(positions, np.arange(len(mono)), mono).astype(np.float32)
+
+    def trim_silence(self, mono: np.ndarray, sample_rate: int) -> np.ndarray:
+        """
+        Energy based VAD: drop frames before the first and after the last voiced frame
+        :param mono:
+        :param sample_rate:
+        :return: trimmed samples. unchanged if no frame is voiced
+        """
+        frame_length = sample_rate * VAD_FRAME_MS // 1000
+        frame_count = len(mono) // frame_length
+        if frame_count == 0:
+            return mono
+
+        frames = mono[:frame_count * frame_length].reshape(frame_count, frame_length)
+        rms = np.sqrt(np.mean(frames ** 2, axis=1))
+        db = 20 * np.log10(rms + 1e-10)
+        threshold = max(db.max() + VAD_THRESHOLD_DB, VAD_MIN_THRESHOLD_DB)
+        voiced = np.flatnonzero(db > threshold)
+        if len(voiced) == 0:
+            return mono
+
+        padding = sample_rate * VAD_PADDING_MS // 1000
+        start = max(voiced[0] * frame_length - padding, 0)
+        end = min((voiced[-1] + 1) * frame_length + padding, len(mono))
+        return mono[start:end]
+
+    def encode_wav(self, mono: np.ndarray, sample_rate: int) -> bytes:
+        pcm = (np.clip(mono, -1.0, 1.0) * 32767).astype("<i2")
+        buffer = io.BytesIO()
+        with wave.open(buffer, "wb") as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(sample_rate)
+            wav.writeframes(pcm.tobytes())
+        return buffer.getvalue()
+
+    def to_pcm(self, data: bytes, filename: str) -> np.ndarray | None:
+        """
+        Decode, downmix, resample and trim
+        :param data: encoded audio
+        :param filename:
+        :return: mono float32 samples at TARGET_SAMPLE_RATE or None if not decodable
+        """
+        decoded = self.decode(data, filename)
+        if decoded is None:
+            return None
+        samples, sample_rate = decoded
+        mono = self.resample(self.downmix(samples), sample_rate)
+        return self.trim_silence(mono, TARGET_SAMPLE_RATE)
+
+    def process(self, data: bytes, filename: str) -> bytes | None:
+        """
+        :param data: encoded audio
+        :param filename:
+        :return: 16 kHz mono 16-bit WAV or None if the audio can't be decoded (send the original then)
+        """
+        mono = self.to_pcm(data, filename)
+        if mono is None:
+            return None
+        return self.encode_wav(mono, TARGET_SAMPLE_RATE)
@@ -1,6 +1,6 @@
 import random
+import time
 
-from passlib.context import CryptContext
 from jose import jwt, JWTError
 from fastapi.security import OAuth2PasswordBearer
 from fastapi import Depends
@@ -13,27 +13,41 @@ from dotenv import load_dotenv
 from app.db import get_db
 from app.exceptions.exceptions import InvalidCredentialException, NotFoundException
 from app.models.user import User
-from app.service.email_service import EmailService
+from app.service.mail_queue_service import mail_queue_service
+from app.utils import password_utils
+from app.utils.executors import password_executor
+from app.utils.lru_cache import LRUCache
 
 load_dotenv()
 
 SECRET_KEY = os.getenv("SECRET_KEY", "secret")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "30"))
+USER_CACHE_MAX_ENTRIES = int(os.getenv("USER_CACHE_MAX_ENTRIES", "1024"))
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
+# user id -> detached User, token -> decoded payload (kept until the token expires)
+user_cache = LRUCache(USER_CACHE_MAX_ENTRIES, USER_CACHE_TTL_SECONDS)
+token_cache = LRUCache(USER_CACHE_MAX_ENTRIES)
 
 
 class AuthService:
     def __init__(self):
-        self.email_service = EmailService()
+        self.mail_queue_service = mail_queue_service
 
-    def hash_password(self, password: str) -> str:
-        return pwd_context.hash(password)
+    async def hash_password_async(self, password: str) -> str:
+        """Hash in the password worker processes so the event loop keeps serving other requests"""
+        return await password_executor.run(password_utils.hash_password, password)
 
-    def verify_password(self, plain_pw: str, hashed_pw: str) -> bool:
-        return pwd_context.verify(plain_pw, hashed_pw)
+    async def verify_and_update_password_async(self, plain_pw: str, hashed_pw: str) -> tuple[bool, str | None]:
+        """
+        Verify in the password worker processes
+        :param plain_pw:
+        :param hashed_pw:
+        :return: (valid, new hash to store when the cost factor changed, else None)
+        """
+        return await password_executor.run(password_utils.verify_and_update, plain_pw, hashed_pw)
 
     def create_access_token(self, data: dict, expire_delta: timedelta = None):
         to_encode = data.copy()
@@ -52,26 +66,50 @@ class AuthService:
         あなたの認証コードは {otp} です。
         このコードは30分以内有効です。
         """
-        self.email_service.send_text_email(to_email=user_email, subject=subject, body=body)
+        # sent in the background: login returns without waiting for SMTP
+        self.mail_queue_service.enqueue(to_email=user_email, subject=subject, body=body)
 
 
 def decode_access_token(token: str):
+    payload = token_cache.get(token)
+    if payload is not None:
+        return payload
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
     except JWTError:
         return None
 
+    ttl = payload.get("exp", 0) - time.time()
+    if ttl > 0:
+        token_cache.set(token, payload, ttl=ttl)
+    return payload
+
+
+def invalidate_cached_user(user_id):
+    """
+    Drop the cached user so the next request reads it from DB again. Call this after updating the user
+    :param user_id:
+    """
+    user_cache.pop(str(user_id))
+
 
 async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)) -> User:
     payload = decode_access_token(token)
     if payload is None:
         raise InvalidCredentialException()
 
-    result = await db.execute(select(User).where(User.id == payload.get("sub")))
+    user_id = str(payload.get("sub"))
+    user = user_cache.get(user_id)
+    if user is not None:
+        return user
+
+    result = await db.execute(select(User).where(User.id == user_id))
     user = result.scalar_one_or_none()
     if user is None:
         raise NotFoundException(item="User ")
 
+    # detach so the cached instance is shared safely by later requests
+    db.expunge(user)
+    user_cache.set(user_id, user)
     return user
-
@@ -0,0 +1,95 @@
+import importlib.util
+import logging
+import os
+
+import httpx
+from dotenv import load_dotenv
+from openai import AsyncClient
+
+load_dotenv()
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+SUPABASE_URL = os.getenv("SUPABASE_URL")
+SUPABASE_KEY = os.getenv("SERVICE_ROLE_SECRET")
+
+# connection pool shared by all outgoing HTTP calls of a client
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "false").lower() == "true"
+
+# per-call timeouts (seconds)
+OPENAI_CHAT_TIMEOUT = float(os.getenv("OPENAI_CHAT_TIMEOUT", "60"))
+OPENAI_TTS_TIMEOUT = float(os.getenv("OPENAI_TTS_TIMEOUT", "60"))
+OPENAI_TRANSCRIBE_TIMEOUT = float(os.getenv("OPENAI_TRANSCRIBE_TIMEOUT", "120"))
+SUPABASE_STORAGE_TIMEOUT = float(os.getenv("SUPABASE_STORAGE_TIMEOUT", "30"))
+
+logger = logging.getLogger(__name__)
+
+
+def _http2_available() -> bool:
+    if HTTP2_ENABLED and importlib.util.find_spec("h2") is None:
+        logger.warning("HTTP2_ENABLED is set but the h2 package is not installed. Falling back to HTTP/1.1")
+        return False
+    return HTTP2_ENABLED
+
+
+class ClientRegistry:
+    """
+    Shared API clients with pooled connections.
+    main.py starts the registry on startup and closes it on shutdown.
+    Clients are also created on first use, so services work outside the app lifespan.
+    """
+
+    def __init__(self):
+        self._openai: AsyncClient | None = None
+        self._storage: httpx.AsyncClient | None = None
+
+    @staticmethod
+    def _limits() -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        )
+
+    @property
+    def openai(self) -> AsyncClient:
+        if self._openai is None:
+            http_client = httpx.AsyncClient(
+                limits=self._limits(),
+                timeout=httpx.Timeout(OPENAI_CHAT_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+                http2=_http2_available(),
+            )
+            self._openai = AsyncClient(api_key=OPENAI_API_KEY, http_client=http_client)
+        return self._openai
+
+    @property
+    def storage(self) -> httpx.AsyncClient:
+        """Async client for the Supabase Storage REST API"""
+        if self._storage is None:
+            self._storage = httpx.AsyncClient(
+                base_url=f"{SUPABASE_URL}/storage/v1",
+                headers={"Authorization": f"Bearer {SUPABASE_KEY}", "apikey": SUPABASE_KEY or ""},
+                limits=self._limits(),
+                timeout=httpx.Timeout(SUPABASE_STORAGE_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+                http2=_http2_available(),
+            )
+        return self._storage
+
+    async def start(self):
+        _ = self.openai
+        _ = self.storage
+        logger.info("🔌 API clients started")
+
+    async def close(self):
+        if self._openai is not None:
+            await self._openai.close()
+            self._openai = None
+        if self._storage is not None:
+            await self._storage.aclose()
+            self._storage = None
+        logger.info("🔌 API clients closed")
+
+
+client_registry = ClientRegistry()
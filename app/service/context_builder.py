@@ -0,0 +1,138 @@
+import functools
+import logging
+import os
+from typing import Callable
+
+from dotenv import load_dotenv
+
+from app.dtos.openai_dto import ChatMessage, ChatMessages
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+load_dotenv()
+# prompt token budget for models not listed below
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "4000"))
+DEFAULT_MODEL_TOKEN_BUDGETS = {
+    "gpt-4o-mini": 8000,
+    "gpt-4o": 8000,
+    "gpt-4-turbo": 8000,
+    "gpt-4": 4000,
+    "gpt-3.5-turbo": 3000,
+}
+# every message costs a few tokens for role and separators
+TOKENS_PER_MESSAGE = 4
+logger = logging.getLogger(__name__)
+
+
+def load_token_budgets() -> dict[str, int]:
+    """
+    Default budgets overridden by CONTEXT_TOKEN_BUDGETS, e.g. "gpt-4o-mini=12000,gpt-4o=6000"
+    :return: dict of model -> prompt token budget
+    """
+    budgets = dict(DEFAULT_MODEL_TOKEN_BUDGETS)
+    for item in filter(None, os.getenv("CONTEXT_TOKEN_BUDGETS", "").split(",")):
+        model, budget = item.split("=")
+        budgets[model.strip()] = int(budget)
+    return budgets
+
+
+def _estimate_tokens(text: str) -> int:
+    """Rough count without a tokenizer: ~4 ASCII characters per token, ~1 token per other character (e.g. Japanese)"""
+    ascii_count = sum(1 for c in text if c.isascii())
+    return (ascii_count + 3) // 4 + len(text) - ascii_count
+
+
+@functools.lru_cache(maxsize=None)
+def get_token_counter(model: str) -> Callable[[str], int]:
+    """
+    :param model:
+    :return: function counting tokens of a text. falls back to an estimate when tiktoken or its data is unavailable
+    """
+    if tiktoken is not None:
+        try:
+            try:
+                encoding = tiktoken.encoding_for_model(model)
+            except KeyError:
+                encoding = tiktoken.get_encoding("o200k_base")
+            return lambda text: len(encoding.encode(text, disallowed_special=()))
+        except Exception as e:
+            # encodings are downloaded on first use
+            logger.warning(f"tiktoken is unavailable for {model}, estimating tokens: {e!r}")
+    return _estimate_tokens
+
+
+class ContextBuilder:
+    """
+    Fit chat messages into the token budget of the model.
+    Fixed messages (system prompt) and the new user message are always kept;
+    history is added from the newest turn backwards until the budget is used up.
+    """
+
+    def __init__(self, budgets: dict[str, int] = None, default_budget: int = CONTEXT_TOKEN_BUDGET):
+        self.budgets = budgets if budgets is not None else load_token_budgets()
+        self.default_budget = default_budget
+        self.requests = 0
+        self.trimmed_requests = 0
+        self.tokens_saved = 0
+
+    def budget_for(self, model: str) -> int:
+        if model in self.budgets:
+            return self.budgets[model]
+        # e.g. dated versions like gpt-4o-mini-2024-07-18
+        for name in sorted(self.budgets, key=len, reverse=True):
+            if model.startswith(name):
+                return self.budgets[name]
+        return self.default_budget
+
+    def count(self, model: str, message: ChatMessage) -> int:
+        return get_token_counter(model)(message["content"]) + TOKENS_PER_MESSAGE
+
+    def build(self, model: str, fixed: ChatMessages, history: ChatMessages, message: ChatMessage) -> ChatMessages:
+        """
+        :param model:
+        :param fixed: messages always sent first (system prompt etc.)
+        :param history: previous turns, oldest first
+        :param message: new user message
+        :return: fixed + most recent history that fits + message
+        """
+        budget = self.budget_for(model)
+        used = sum(self.count(model, m) for m in fixed) + self.count(model, message)
+
+        kept: ChatMessages = []
+        dropped_tokens = 0
+        for index in range(len(history) - 1, -1, -1):
+            tokens = self.count(model, history[index])
+            if used + tokens > budget:
+                dropped_tokens = sum(self.count(model, m) for m in history[:index + 1])
+                break
+            kept.append(history[index])
+            used += tokens
+        kept.reverse()
+
+        self.requests += 1
+        if dropped_tokens:
+            self.trimmed_requests += 1
+            self.tokens_saved += dropped_tokens
+            logger.info(
+                f"✂️ Context trimmed: kept {len(kept)}/{len(history)} turns, "
+                f"{used} tokens sent, {dropped_tokens} tokens saved ({model}, budget {budget})"
+            )
+        return [*fixed, *kept, message]
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "trimmedRequests": self.trimmed_requests,
+            "tokensSaved": self.tokens_saved,
+        }
+
+    def warm_up(self):
+        """Load the tokenizers of known models (tiktoken downloads them on first use). Blocking"""
+        for model in self.budgets:
+            get_token_counter(model)
+
+
+context_builder = ContextBuilder()
@@ -1,4 +1,5 @@
 import smtplib
+from email.message import Message
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import os
@@ -18,29 +19,51 @@ class EmailService:
         self.smtp_password = os.getenv("SMTP_PASSWORD")
         self.from_email = os.getenv("FROM_EMAIL")
         self.use_ssl = os.getenv("SMTP_USE_SSL", "false").lower() == "true"
+        # plain SMTP servers (e.g. a local test server) don't support STARTTLS
+        self.use_starttls = os.getenv("SMTP_STARTTLS", "true").lower() == "true"
+        # seconds for connecting and for each command. a hung server must not stall the single mail thread
+        self.timeout = float(os.getenv("SMTP_TIMEOUT_SECONDS", "10"))
 
-    def send_text_email(self, to_email: str, subject: str, body: str):
+    def connect(self) -> smtplib.SMTP:
+        """
+        Open an SMTP connection and log in. The caller closes it (quit)
+        :return: connected server
+        """
+        if self.use_ssl:
+            server = smtplib.SMTP_SSL(self.smtp_host, self.smtp_port, timeout=self.timeout)
+        else:
+            server = smtplib.SMTP(self.smtp_host, self.smtp_port, timeout=self.timeout)
+        try:
+            if not self.use_ssl:
+                server.ehlo()
+                if self.use_starttls:
+                    server.starttls()
+            if self.smtp_user:
+                server.login(self.smtp_user, self.smtp_password)
+        except Exception:
+            server.close()
+            raise
+        return server
+
+    def build_text_message(self, to_email: str, subject: str, body: str) -> Message:
         msg = MIMEText(body)
         msg["Subject"] = subject
         msg["From"] = self.from_email
         msg["To"] = to_email
+        return msg
 
+    def _send(self, msg: Message):
         try:
-            if self.use_ssl:
-                with smtplib.SMTP_SSL(self.smtp_host, self.smtp_port) as server:
-                    server.login(self.smtp_user, self.smtp_password)
-                    server.send_message(msg)
-            else:
-                with smtplib.SMTP(self.smtp_host, self.smtp_port) as server:
-                    server.ehlo()
-                    server.starttls()
-                    server.login(self.smtp_user, self.smtp_password)
-                    server.send_message(msg)
+            with self.connect() as server:
+                server.send_message(msg)
             logger.info("Email sent successfully")
         except Exception as e:
             logger.error("Failed to send email")
             raise e
 
+    def send_text_email(self, to_email: str, subject: str, body: str):
+        self._send(self.build_text_message(to_email, subject, body))
+
     def send_html_email(self, to_email: str, subject: str, html_content: str):
         msg = MIMEMultipart("alternative")
         msg["Subject"] = subject
@@ -49,19 +72,4 @@ class EmailService:
 
         html_part = MIMEText(html_content, "html")
         msg.attach(html_part)
-
-        try:
-            if self.use_ssl:
-                with smtplib.SMTP_SSL(self.smtp_host, self.smtp_port) as server:
-                    server.login(self.smtp_user, self.smtp_password)
-                    server.send_message(msg)
-            else:
-                with smtplib.SMTP(self.smtp_host, self.smtp_port) as server:
-                    server.ehlo()
-                    server.starttls()
-                    server.login(self.smtp_user, self.smtp_password)
-                    server.send_message(msg)
-            logger.info("Email sent successfully")
-        except Exception as e:
-            logger.error("Failed to send email")
-            raise e
+        self._send(msg)
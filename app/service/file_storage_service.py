@@ -1,39 +1,91 @@
-import asyncio
-import os
+import logging
+import uuid
+from typing import AsyncIterable
 
 from fastapi import HTTPException
-from dotenv import load_dotenv
-from supabase import create_client
 
-load_dotenv()
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SERVICE_ROLE_SECRET")
-supabase_client = create_client(SUPABASE_URL, SUPABASE_KEY)
+from app.service.client_registry import ClientRegistry, client_registry, SUPABASE_URL
+
+logger = logging.getLogger(__name__)
 
 
 class FileStorageService:
-    def _upload_to_supabase(self, filepath: str, bucket: str) -> str:
+    def __init__(self, clients: ClientRegistry = client_registry):
+        self.clients = clients
+
+    def public_url(self, filename: str, bucket: str = "ai-speak") -> str:
+        return f"{SUPABASE_URL}/storage/v1/object/public/{bucket}/{filename}"
+
+    async def _upload(
+            self,
+            content: bytes | AsyncIterable[bytes],
+            filename: str,
+            bucket: str,
+            content_type: str,
+            upsert: bool) -> str:
         """
+        Upload to Supabase Storage REST API on the shared async http client
         :rtype: str
         """
         try:
-            filename = os.path.basename(filepath)
-            if not os.path.exists(filepath):
-                raise FileNotFoundError(f"file is not existing: {filepath}")
-
-            with open(filepath, "rb") as f:
-                supabase_client.storage.from_(bucket).upload(filename, f, file_options={"content-type": "audio/mpeg"})
-
-            public_url = f"{SUPABASE_URL}/storage/v1/object/public/{bucket}/{filename}"
-            return public_url
+            response = await self.clients.storage.post(
+                f"/object/{bucket}/{filename}",
+                content=content,
+                headers={"content-type": content_type, "x-upsert": "true" if upsert else "false"}
+            )
+            response.raise_for_status()
+            return self.public_url(filename, bucket)
         except Exception as e:
             raise HTTPException(status_code=500, detail=str(e))
-        finally:
-            os.remove(filepath)
 
-    async def upload_to_supabase_async(self, filepath: str, bucket: str = "ai-speak") -> str:
-        """An asynchronous wrapper for the synchronous _upload_to_supabase in a separate thread"""
-        loop = asyncio.get_running_loop()
-        return await loop.run_in_executor(None, self._upload_to_supabase, filepath, bucket)
+    async def exists_async(self, filename: str, bucket: str = "ai-speak", timeout: float | None = None) -> bool:
+        """
+        :param filename:
+        :param bucket:
+        :param timeout: seconds. None uses the timeout of the storage client
+        :return: True if the object exists. False when storage can't be reached, so callers fall back to creating it
+        """
+        try:
+            kwargs = {"timeout": timeout} if timeout is not None else {}
+            response = await self.clients.storage.head(f"/object/{bucket}/{filename}", **kwargs)
+            return response.status_code == 200
+        except Exception as e:
+            logger.warning(f"Failed to check {bucket}/{filename} in storage: {e!r}")
+            return False
 
+    async def upload_bytes_async(
+            self,
+            data: bytes,
+            filename: str = None,
+            bucket: str = "ai-speak",
+            content_type: str = "audio/mpeg",
+            upsert: bool = False) -> str:
+        """
+        Upload in-memory data without writing a local file
+        :param data: file content
+        :param filename: object name in the bucket. random mp3 name when omitted
+        :param bucket:
+        :param content_type:
+        :param upsert: overwrite an existing object with the same name
+        :return: public url
+        """
+        return await self._upload(data, filename or f"{uuid.uuid4()}.mp3", bucket, content_type, upsert)
 
+    async def upload_stream_async(
+            self,
+            chunks: AsyncIterable[bytes],
+            filename: str = None,
+            bucket: str = "ai-speak",
+            content_type: str = "audio/mpeg",
+            upsert: bool = False) -> str:
+        """
+        Upload data produced by an async byte iterator without writing a local file.
+        Chunks are sent as they come (chunked transfer encoding)
+        :param chunks: async iterator of bytes
+        :param filename: object name in the bucket. random mp3 name when omitted
+        :param bucket:
+        :param content_type:
+        :param upsert: overwrite an existing object with the same name
+        :return: public url
+        """
+        return await self._upload(chunks, filename or f"{uuid.uuid4()}.mp3", bucket, content_type, upsert)
@@ -1,17 +1,121 @@
 import asyncio
+import io
+import os
+from typing import AsyncIterator, List
+
+from dotenv import load_dotenv
 from gtts import gTTS
-import uuid
+
+from app.service.tts_cache_service import tts_cache_service
+from app.utils.executors import gtts_executor
+from app.utils.sentence_splitter import SentenceSplitter
+
+load_dotenv()
+# sentences are grouped into segments up to this length. one segment is one synthesis job
+GTTS_SEGMENT_MAX_CHARS = int(os.getenv("GTTS_SEGMENT_MAX_CHARS", "200"))
+# segments of one request synthesized at the same time
+GTTS_SEGMENT_CONCURRENCY = int(os.getenv("GTTS_SEGMENT_CONCURRENCY", "4"))
+
+
+class SegmentStream:
+    """
+    Synthesized mp3 segments in order. Segments are synthesized before they are iterated.
+    aclose cancels the segments not sent yet. Attach it to the response as a BackgroundTask:
+    the body iterator never starts if the client leaves before the response body.
+    """
+
+    def __init__(self, first: bytes, tasks: List[asyncio.Task]):
+        self.first = first
+        self.tasks = tasks
+
+    def __aiter__(self) -> AsyncIterator[bytes]:
+        return self._iter()
+
+    async def _iter(self) -> AsyncIterator[bytes]:
+        try:
+            yield self.first
+            for task in self.tasks:
+                yield await task
+        finally:
+            # client went away or a segment failed: stop the rest
+            await self.aclose()
+
+    async def aclose(self):
+        for task in self.tasks:
+            task.cancel()
+            # errors of segments that won't be sent don't matter
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
 
 
 class GttsService:
-    def _generate_audio(self, text: str, lang: str = "ja") -> str:
+    def _generate_audio(self, text: str, lang: str = "ja") -> bytes:
         tts = gTTS(text=text, lang=lang)
-        filename = f"{uuid.uuid4()}.mp3"
-        tts.save(filename)
-        return filename
+        fp = io.BytesIO()
+        tts.write_to_fp(fp)
+        return fp.getvalue()
+
+    @staticmethod
+    def split_segments(text: str, max_chars: int = GTTS_SEGMENT_MAX_CHARS) -> List[str]:
+        """
+        Split text into sentence segments. The first sentence is its own segment so audio starts early
+        :param text:
+        :param max_chars: longer segments are only made of a single long sentence
+        :return: list of segments
+        """
+        sentences = SentenceSplitter.split(text)
+        if not sentences:
+            return [text]
+
+        segments = [sentences[0]]
+        current = ""
+        for sentence in sentences[1:]:
+            if current and len(current) + len(sentence) + 1 > max_chars:
+                segments.append(current)
+                current = ""
+            current = f"{current} {sentence}" if current else sentence
+        if current:
+            segments.append(current)
+        return segments
+
+    async def stream_audio(self, text: str, lang: str = "ja") -> SegmentStream:
+        """
+        Synthesize segments in parallel in the gTTS thread pool and return them in order.
+        Waits for the first segment, so errors are raised here before any audio is sent.
+        MP3 segments can be played back to back, so the chunks form one audio stream.
+        :param text:
+        :param lang:
+        :return: async iterable of mp3 bytes per segment. call aclose when it may not be iterated to the end
+        """
+        semaphore = asyncio.Semaphore(GTTS_SEGMENT_CONCURRENCY)
+
+        async def synthesize(segment: str) -> bytes:
+            async with semaphore:
+                return await gtts_executor.run(self._generate_audio, segment, lang)
+
+        tasks = [asyncio.create_task(synthesize(segment)) for segment in self.split_segments(text)]
+        try:
+            first = await tasks[0]
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+                task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            raise
+        return SegmentStream(first, tasks[1:])
 
-    async def generate_audio_async(self, text: str, lang: str = "ja") -> str:
-        """An asynchronous wrapper for the synchronous _generate_audio in a separate thread"""
-        loop = asyncio.get_running_loop()
-        return await loop.run_in_executor(None, self._generate_audio, text, lang)
+    async def generate_audio_async(self, text: str, lang: str = "ja") -> bytes:
+        """Synthesize segments in parallel in the dedicated gTTS thread pool and join them"""
+        return b"".join([chunk async for chunk in await self.stream_audio(text, lang)])
 
+    async def generate_audio_url_async(self, text: str, lang: str = "ja") -> str:
+        """
+        Generate audio with cache: reuse audio already generated for the same text and language
+        :param text:
+        :param lang:
+        :return: public audio url
+        """
+        return await tts_cache_service.get_or_create(
+            text,
+            lambda: self.generate_audio_async(text, lang),
+            model="gtts",
+            lang=lang
+        )
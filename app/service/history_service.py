@@ -1,18 +1,48 @@
+import os
 import uuid
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import List, Dict
 
+from dotenv import load_dotenv
 from fastapi import Depends, HTTPException
-from sqlalchemy import select
+from sqlalchemy import select, tuple_, insert
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 
 from app.db import get_db
 from app.dtos.history_dto import MessageBase
 from app.exceptions.exceptions import NoAccessConversationException
 from app.models import Message, Conversation
+from app.utils.pagination import encode_cursor, decode_cursor
+
+load_dotenv()
+# a new conversation is saved together with up to this many messages in one statement (one round trip).
+# compiling a multi-row VALUES costs more than a round trip beyond that (benchmarks/history_insert.py)
+HISTORY_SINGLE_STATEMENT_MAX_MESSAGES = int(os.getenv("HISTORY_SINGLE_STATEMENT_MAX_MESSAGES", "100"))
 
 
 class HistoryService:
+    @staticmethod
+    def _conversation_to_dict(conv: Conversation) -> Dict:
+        return {
+            "id": str(conv.id),
+            "title": conv.title,
+            "userId": str(conv.user_id),
+            "createdAt": conv.created_at.isoformat(),
+        }
+
+    @staticmethod
+    def _message_to_dict(message: Message) -> Dict:
+        return {
+            "id": str(message.id),
+            "role": message.role,
+            "content": message.content,
+            "translatedContent": message.translated_content,
+            "conversationId": str(message.conversation_id),
+            "audioUrl": message.audio_url,
+            "createdAt": message.created_at.isoformat(),
+        }
+
     async def get_message(self, conversation_id: str, session: AsyncSession = Depends(get_db)):
         result = await session.execute(
             select(Message).where(Message.conversation_id == conversation_id).order_by(Message.created_at.asc())
@@ -52,16 +82,38 @@ class HistoryService:
     async def get_conversation_list(self, user_id: str, session: AsyncSession = Depends(get_db)):
         conversations = await self.get_user_conversations(user_id, session)
 
-        conversation_list = []
-        for conv in conversations:
-            conversation_list.append({
-                "id": str(conv.id),
-                "title": conv.title,
-                "userId": str(conv.user_id),
-                "createdAt": conv.created_at.isoformat(),
-            })
+        return [self._conversation_to_dict(conv) for conv in conversations]
+
+    async def get_conversation_page(
+            self,
+            user_id: str,
+            limit: int,
+            cursor: str | None = None,
+            session: AsyncSession = Depends(get_db)) -> Dict:
+        """
+        Keyset pagination of the user's conversations, newest first, keyed on (created_at, id)
+        :param user_id:
+        :param limit: page size
+        :param cursor: nextCursor of the previous page
+        :param session:
+        :return: {"items": [...], "nextCursor": str | None}
+        """
+        query = (
+            select(Conversation)
+            .where(Conversation.user_id == user_id)
+            .order_by(Conversation.created_at.desc(), Conversation.id.desc())
+            .limit(limit + 1)
+        )
+        if cursor:
+            created_at, conversation_id = decode_cursor(cursor)
+            query = query.where(tuple_(Conversation.created_at, Conversation.id) < tuple_(created_at, conversation_id))
+
+        result = await session.execute(query)
+        conversations = result.scalars().all()
+        page = conversations[:limit]
+        next_cursor = encode_cursor(page[-1].created_at, page[-1].id) if len(conversations) > limit else None
 
-        return conversation_list
+        return {"items": [self._conversation_to_dict(conv) for conv in page], "nextCursor": next_cursor}
 
     async def save_conversation(self, user_id: str, title: str, session: AsyncSession = Depends(get_db)):
         conversation = Conversation(
@@ -83,19 +135,74 @@ class HistoryService:
         # messages = await self.get_message(conversation_id, session)
         messages = await self.get_message_list_if_owner(conversation_id, user_id, session)
 
-        message_list = []
-        for message in messages:
-            message_list.append({
-                "id": str(message.id),
-                "role": message.role,
-                "content": message.content,
-                "translatedContent": message.translated_content,
-                "conversationId": str(message.conversation_id),
-                "audioUrl": message.audio_url,
-                "createdAt": message.created_at.isoformat(),
-            })
+        return [self._message_to_dict(message) for message in messages]
+
+    async def get_message_page(
+            self,
+            conversation_id: str,
+            user_id: str,
+            limit: int,
+            cursor: str | None = None,
+            session: AsyncSession = Depends(get_db)) -> Dict:
+        """
+        Keyset pagination of a conversation's messages, oldest first, keyed on (created_at, id)
+        :param conversation_id:
+        :param user_id: owner of the conversation
+        :param limit: page size
+        :param cursor: nextCursor of the previous page
+        :param session:
+        :return: {"items": [...], "nextCursor": str | None}
+        """
+        owner = await session.execute(
+            select(Conversation.id).where(Conversation.id == conversation_id, Conversation.user_id == user_id)
+        )
+        if owner.scalar_one_or_none() is None:
+            raise NoAccessConversationException()
+
+        query = (
+            select(Message)
+            .where(Message.conversation_id == conversation_id)
+            .order_by(Message.created_at.asc(), Message.id.asc())
+            .limit(limit + 1)
+        )
+        if cursor:
+            created_at, message_id = decode_cursor(cursor)
+            query = query.where(tuple_(Message.created_at, Message.id) > tuple_(created_at, message_id))
+
+        result = await session.execute(query)
+        messages = result.scalars().all()
+        page = messages[:limit]
+        next_cursor = encode_cursor(page[-1].created_at, page[-1].id) if len(messages) > limit else None
+
+        return {"items": [self._message_to_dict(message) for message in page], "nextCursor": next_cursor}
+
+    @staticmethod
+    def _message_rows(data: List[MessageBase], conversation_id, created_at: datetime) -> List[Dict]:
+        """
+        Rows for a bulk insert. created_at uses the app clock like the model defaults,
+        each row 1 microsecond after the previous one so the order is kept
+        :param data:
+        :param conversation_id: id value or SQL expression
+        :param created_at: time of the first row
+        :return: list of column values
+        """
+        return [
+            {
+                "id": uuid.uuid4(),
+                "conversation_id": conversation_id,
+                "role": m.role,
+                "content": m.content,
+                "translated_content": m.translatedContent,
+                "audio_url": m.audioUrl,
+                "created_at": created_at + timedelta(microseconds=index),
+            } for index, m in enumerate(data)
+        ]
 
-        return message_list
+    @staticmethod
+    async def _insert_messages(rows: List[Dict], session: AsyncSession):
+        """executemany: SQLAlchemy sends the rows as multi-row inserts, in pages below the driver's parameter limit"""
+        if rows:
+            await session.execute(insert(Message), rows)
 
     async def save_messages(
             self,
@@ -103,33 +210,87 @@ class HistoryService:
             conversation_id: str,
             session: AsyncSession = Depends(get_db)):
         try:
-            if conversation_id:
-                for m in data:
-                    message = Message(
-                        id=uuid.uuid4(),
-                        conversation_id=conversation_id,
-                        role=m.role,
-                        content=m.content,
-                        translated_content=m.translatedContent,
-                        audio_url=m.audioUrl,
-                        created_at=datetime.now()
-                    )
-                    session.add(message)
+            if conversation_id and data:
+                await self._insert_messages(self._message_rows(data, conversation_id, datetime.now()), session)
                 await session.commit()
 
         except Exception as e:
             await session.rollback()
             raise HTTPException(status_code=500, detail=str(e))
 
-    async def get_history(self, conversations, session: AsyncSession = Depends(get_db)) -> List[Dict]:
+    async def save_conversation_with_messages(
+            self,
+            user_id: str,
+            title: str,
+            data: List[MessageBase],
+            session: AsyncSession = Depends(get_db)) -> uuid.UUID:
+        """
+        Create a conversation and its messages in one statement.
+        Messages beyond HISTORY_SINGLE_STATEMENT_MAX_MESSAGES follow in a bulk insert in the same transaction
+        :param user_id:
+        :param title:
+        :param data: messages
+        :param session:
+        :return: conversation id
+        """
+        conversation_id = uuid.uuid4()
+        created_at = datetime.now()
+        conversation_insert = insert(Conversation).values(
+            id=conversation_id,
+            user_id=user_id,
+            title=title,
+            created_at=created_at
+        )
+        try:
+            if data:
+                new_conversation = conversation_insert.returning(Conversation.id).cte("new_conversation")
+                rows = self._message_rows(data, conversation_id, created_at)
+                new_conversation_id = select(new_conversation.c.id).scalar_subquery()
+                first = [
+                    {**row, "conversation_id": new_conversation_id}
+                    for row in rows[:HISTORY_SINGLE_STATEMENT_MAX_MESSAGES]
+                ]
+                await session.execute(insert(Message).values(first).add_cte(new_conversation))
+                await self._insert_messages(rows[HISTORY_SINGLE_STATEMENT_MAX_MESSAGES:], session)
+            else:
+                await session.execute(conversation_insert)
+            await session.commit()
+            return conversation_id
+
+        except Exception as e:
+            await session.rollback()
+            raise HTTPException(status_code=500, detail=str(e))
+
+    async def get_history(
+            self,
+            user_id: str,
+            session: AsyncSession = Depends(get_db),
+            limit: int | None = None,
+            offset: int = 0) -> List[Dict]:
+        """
+        Conversations of the user with their messages.
+        Messages of all conversations in the page are loaded by one extra query (no N+1)
+        :param user_id:
+        :param session:
+        :param limit: max number of conversations. None means all
+        :param offset: number of conversations to skip
+        :return: list of conversations with messages
+        """
         try:
+            query = (
+                select(Conversation)
+                .where(Conversation.user_id == user_id)
+                .options(selectinload(Conversation.messages))
+                .order_by(Conversation.created_at.desc(), Conversation.id.desc())
+                .offset(offset)
+            )
+            if limit is not None:
+                query = query.limit(limit)
+            result = await session.execute(query)
+            conversations = result.scalars().all()
+
             history = []
             for conv in conversations:
-                conv_result = await session.execute(
-                    select(Message).where(Message.conversation_id == conv.id).order_by(Message.created_at)
-                )
-                messages = conv_result.scalars().all()
-
                 history.append({
                     "conversationId": str(conv.id),
                     "title": conv.title,
@@ -141,11 +302,10 @@ class HistoryService:
                             "translatedContent": msg.translated_content,
                             "audioUrl": msg.audio_url,
                             "createdAt": msg.created_at.isoformat()
-                        } for msg in messages
+                        } for msg in conv.messages
                     ]
                 })
 
             return history
         except Exception as e:
             raise HTTPException(status_code=500, detail=str(e))
-
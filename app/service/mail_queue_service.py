@@ -0,0 +1,196 @@
+import asyncio
+import logging
+import os
+import smtplib
+import time
+from email.message import Message
+
+from dotenv import load_dotenv
+
+from app.exceptions.exceptions import ServiceBusyException
+from app.service.email_service import EmailService
+from app.utils.executors import mail_executor
+
+load_dotenv()
+MAIL_QUEUE_SIZE = int(os.getenv("MAIL_QUEUE_SIZE", "1000"))
+# messages sent over one connection per trip to the mail thread
+MAIL_BATCH_SIZE = int(os.getenv("MAIL_BATCH_SIZE", "20"))
+MAIL_MAX_ATTEMPTS = int(os.getenv("MAIL_MAX_ATTEMPTS", "5"))
+# retry delay doubles per attempt: 1, 2, 4, ... seconds
+MAIL_RETRY_BASE_SECONDS = float(os.getenv("MAIL_RETRY_BASE_SECONDS", "1"))
+# close the SMTP connection after this long without mail
+SMTP_IDLE_TIMEOUT_SECONDS = float(os.getenv("SMTP_IDLE_TIMEOUT_SECONDS", "60"))
+MAIL_SHUTDOWN_TIMEOUT_SECONDS = float(os.getenv("MAIL_SHUTDOWN_TIMEOUT_SECONDS", "10"))
+logger = logging.getLogger(__name__)
+
+
+class OutboundMail:
+    def __init__(self, msg: Message):
+        self.msg = msg
+        self.attempts = 0
+
+
+class MailQueueService:
+    """
+    Outbound mail queue. Requests only enqueue; a background task sends in batches
+    over one persistent SMTP connection that lives on the mail thread.
+    Failed messages are retried with exponential backoff.
+    """
+
+    def __init__(
+            self,
+            email_service: EmailService = None,
+            maxsize: int = MAIL_QUEUE_SIZE,
+            batch_size: int = MAIL_BATCH_SIZE,
+            max_attempts: int = MAIL_MAX_ATTEMPTS,
+            retry_base_delay: float = MAIL_RETRY_BASE_SECONDS,
+            idle_timeout: float = SMTP_IDLE_TIMEOUT_SECONDS):
+        self.email_service = email_service or EmailService()
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.retry_base_delay = retry_base_delay
+        self.idle_timeout = idle_timeout
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.connects = 0
+        self._queue: asyncio.Queue[OutboundMail] | None = None
+        self._task: asyncio.Task | None = None
+        self._retry_tasks: set[asyncio.Task] = set()
+        # only touched on the mail thread
+        self._server: smtplib.SMTP | None = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._queue = self._queue or asyncio.Queue(self.maxsize)
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self, timeout: float = MAIL_SHUTDOWN_TIMEOUT_SECONDS):
+        """Send what is queued (up to timeout), then stop the sender and close the connection"""
+        if self._task is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"📧 {self._queue.qsize()} queued mails were not sent before shutdown")
+        for task in [self._task, *self._retry_tasks]:
+            task.cancel()
+        await asyncio.gather(self._task, *self._retry_tasks, return_exceptions=True)
+        self._task = None
+        await mail_executor.run(self._disconnect)
+
+    def enqueue(self, to_email: str, subject: str, body: str):
+        """Queue a text mail and return immediately. The sender task is started on first use"""
+        self.start()
+        try:
+            self._queue.put_nowait(OutboundMail(self.email_service.build_text_message(to_email, subject, body)))
+        except asyncio.QueueFull:
+            raise ServiceBusyException("Mail queue is full. Please retry later.")
+
+    async def _run(self):
+        while True:
+            try:
+                first = await asyncio.wait_for(self._queue.get(), self.idle_timeout)
+            except asyncio.TimeoutError:
+                await mail_executor.run(self._disconnect)
+                continue
+
+            batch = [first]
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                failures = await mail_executor.run(self._send_batch, batch)
+            except Exception as e:
+                failures = [(mail, e) for mail in batch]
+            for mail, error in failures:
+                self._retry_later(mail, error)
+            for _ in batch:
+                self._queue.task_done()
+
+    def _retry_later(self, mail: OutboundMail, error: Exception):
+        mail.attempts += 1
+        if mail.attempts >= self.max_attempts:
+            self.failed += 1
+            logger.error(f"📧 Giving up on mail to {mail.msg['To']} after {mail.attempts} attempts: {error!r}")
+            return
+
+        self.retried += 1
+        delay = self.retry_base_delay * 2 ** (mail.attempts - 1)
+        logger.warning(f"📧 Mail to {mail.msg['To']} failed ({error!r}), retrying in {delay:.1f} sec")
+
+        async def requeue():
+            await asyncio.sleep(delay)
+            await self._queue.put(mail)
+
+        task = asyncio.create_task(requeue())
+        self._retry_tasks.add(task)
+        task.add_done_callback(self._retry_tasks.discard)
+
+    def _send_batch(self, batch: list[OutboundMail]) -> list[tuple[OutboundMail, Exception]]:
+        """
+        Runs on the mail thread
+        :return: mails which could not be sent with their errors
+        """
+        start_time = time.time()
+        failures = []
+        for index, mail in enumerate(batch):
+            try:
+                self._send_one(mail.msg)
+                self.sent += 1
+            except Exception as e:
+                failures.append((mail, e))
+                if self._server is None:
+                    # no connection: don't wait for the SMTP timeout again for every other mail
+                    failures.extend((rest, e) for rest in batch[index + 1:])
+                    break
+        logger.info(f"📧 Sent {len(batch) - len(failures)}/{len(batch)} mails: {time.time() - start_time:.2f} sec")
+        return failures
+
+    def _send_one(self, msg: Message):
+        for attempt in range(2):
+            if self._server is None:
+                self._server = self.email_service.connect()
+                self.connects += 1
+            try:
+                self._server.send_message(msg)
+                return
+            except Exception as e:
+                # a rejected message (e.g. refused recipient) leaves the connection usable
+                if not self._connection_lost(e):
+                    raise
+                self._disconnect()
+                # the server may drop idle connections: reconnect once, then leave it to the retry
+                if attempt:
+                    raise
+
+    @staticmethod
+    def _connection_lost(error: Exception) -> bool:
+        if isinstance(error, smtplib.SMTPResponseException):
+            # 421: server is closing the connection
+            return error.smtp_code == 421
+        if isinstance(error, smtplib.SMTPServerDisconnected):
+            return True
+        return isinstance(error, OSError) and not isinstance(error, smtplib.SMTPException)
+
+    def _disconnect(self):
+        if self._server is None:
+            return
+        try:
+            self._server.quit()
+        except Exception:
+            self._server.close()
+        self._server = None
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "retrying": len(self._retry_tasks),
+            "sent": self.sent,
+            "failed": self.failed,
+            "retried": self.retried,
+            "connects": self.connects,
+        }
+
+
+mail_queue_service = MailQueueService()
@@ -1,36 +1,70 @@
-import io
+import asyncio
+import base64
 import time
 import logging
 
+import numpy as np
 from dotenv import load_dotenv
 from fastapi import HTTPException, UploadFile, File, Form
-from openai import AsyncClient
+from starlette.background import BackgroundTask
 from starlette.responses import StreamingResponse
 import os
-import uuid
-from app.dtos.openai_dto import ChatRequest, ChatMessages
+from typing import AsyncIterator
+
+from app.config import MAX_AUDIO_UPLOAD_BYTES
+from app.dtos.openai_dto import ChatRequest, ChatMessages, ConversationSummary
 from app.models import User
+from app.service.audio_preprocess_service import AudioPreprocessService, AUDIO_PREPROCESS_ENABLED, TARGET_SAMPLE_RATE
+from app.service.client_registry import (
+    ClientRegistry, client_registry, OPENAI_CHAT_TIMEOUT, OPENAI_TTS_TIMEOUT
+)
+from app.service.context_builder import ContextBuilder, context_builder
 from app.service.file_storage_service import FileStorageService
+from app.service.transcription_service import (
+    LongAudioTranscriber, create_transcription_backend, LONG_AUDIO_ENABLED
+)
+from app.service.translation_cache_service import translation_cache_service
+from app.service.tts_cache_service import tts_cache_service
+from app.utils.executors import audio_executor
+from app.utils.sentence_splitter import SentenceSplitter
 
 load_dotenv()
-client = AsyncClient(api_key=os.getenv("OPENAI_API_KEY"))
+# run translation and TTS concurrently in chat_response (set "false" to run them one after another)
+CHAT_PIPELINE_ENABLED = os.getenv("CHAT_PIPELINE_ENABLED", "true").lower() == "true"
+# save voice chat reply audio to storage while streaming it to the client
+VOICE_CHAT_PERSIST_AUDIO = os.getenv("VOICE_CHAT_PERSIST_AUDIO", "false").lower() == "true"
+AUDIO_STREAM_CHUNK_SIZE = 4096
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
 
 class OpenAIService:
-    def __init__(self):
+    def __init__(
+            self,
+            clients: ClientRegistry = client_registry,
+            context: ContextBuilder = context_builder,
+            audio_preprocessor: AudioPreprocessService | None = (
+                AudioPreprocessService() if AUDIO_PREPROCESS_ENABLED else None
+            )):
         self.text_model = "gpt-4o-mini"
         self.translate_model = "gpt-3.5-turbo-1106"
-        self.file_storage_service = FileStorageService()
+        self.clients = clients
+        self.context = context
+        self.file_storage_service = FileStorageService(clients)
+        self.audio_preprocessor = audio_preprocessor
+        self.transcription_backend = create_transcription_backend()
+        self.long_audio_transcriber = (
+            LongAudioTranscriber(self.transcription_backend, audio_preprocessor) if LONG_AUDIO_ENABLED else None
+        )
 
     async def chat_with_text(self, model: str, messages: ChatMessages):
         gpt_model = model if model else self.text_model
         try:
-            chat_response = await client.chat.completions.create(
+            chat_response = await self.clients.openai.chat.completions.create(
                 model=gpt_model,
                 messages=messages,
-                temperature=0.5
+                temperature=0.5,
+                timeout=OPENAI_CHAT_TIMEOUT
             )
             reply_text = chat_response.choices[0].message.content
             return reply_text
@@ -50,101 +84,317 @@ class OpenAIService:
         messages: ChatMessages = [{"role": "user", "content": prompt}]
         return await self.chat_with_text(model, messages)
 
-    async def chat_with_history(self, data: ChatRequest, current_user: User) -> str:
-        messages: ChatMessages = []
-        try:
-            if current_user.prompt_template:
-                messages.append({
+    def _build_chat_messages(
+            self,
+            data: ChatRequest,
+            current_user: User,
+            summary: ConversationSummary | None = None) -> ChatMessages:
+        """
+        :param data:
+        :param current_user:
+        :param summary: rolling summary of the conversation. summary and its recent turns replace the stored
+            turns of history; only turns beyond the stored ones (not saved yet) are taken from history
+        :return: messages for the chat API
+        """
+        fixed: ChatMessages = []
+        if current_user.prompt_template:
+            fixed.append({
+                "role": "system",
+                "content": current_user.prompt_template
+            })
+
+        history: ChatMessages = []
+        if current_user.use_history:
+            history = [{"role": m["role"], "content": m["content"]} for m in data.history]
+            if summary:
+                fixed.append({
                     "role": "system",
-                    "content": current_user.prompt_template
+                    "content": f"Summary of the earlier conversation:\n{summary['summary']}"
                 })
+                stored = summary["message_count"] + len(summary["recent"])
+                history = [*summary["recent"], *history[stored:]]
+        # older turns beyond the token budget of the model are dropped
+        return self.context.build(
+            current_user.preferred_text_model or self.text_model,
+            fixed,
+            history,
+            {"role": "user", "content": data.message}
+        )
 
-            if current_user.use_history:
-                messages.extend([
-                    {"role": m["role"], "content": m["content"]} for m in data.history
-                ])
-            # messages = [{"role": m["role"], "content": m["content"]} for m in data.history]
-            messages.append({"role": "user", "content": data.message})
-
+    async def chat_with_history(
+            self,
+            data: ChatRequest,
+            current_user: User,
+            summary: ConversationSummary | None = None) -> str:
+        try:
+            messages = self._build_chat_messages(data, current_user, summary)
             return await self.chat_with_text(current_user.preferred_text_model, messages)
 
         except Exception as e:
             raise HTTPException(status_code=500, detail=str(e))
 
+    async def chat_stream(
+            self,
+            data: ChatRequest,
+            current_user: User,
+            summary: ConversationSummary | None = None) -> AsyncIterator[dict]:
+        """
+        Stream chat reply token by token.
+        Each complete sentence is sent to TTS right away and its audio is emitted in sentence order.
+        Events:
+            {"type": "token", "content": str}
+            {"type": "audio", "index": int, "text": str, "audio": base64 mp3}
+            {"type": "done", "content": full reply}
+            {"type": "error", "message": str}
+        :param data:
+        :param current_user:
+        :param summary: rolling summary of the conversation
+        :return: async iterator of events
+        """
+        messages = self._build_chat_messages(data, current_user, summary)
+        gpt_model = current_user.preferred_text_model or self.text_model
+        queue: asyncio.Queue = asyncio.Queue()
+        tts_tasks: list[asyncio.Task] = []
+
+        async def synthesize(index: int, sentence: str, previous: asyncio.Task | None):
+            speech_response = await self.tts(sentence)
+            audio_b64 = base64.b64encode(speech_response.content).decode("ascii")
+            # keep audio in sentence order
+            if previous is not None:
+                await previous
+            if index == 0:
+                logger.info(f"🔊 Time to first audio: {time.time() - start_time:.2f} sec")
+            await queue.put({"type": "audio", "index": index, "text": sentence, "audio": audio_b64})
+
+        def schedule_tts(sentence: str):
+            previous = tts_tasks[-1] if tts_tasks else None
+            tts_tasks.append(asyncio.create_task(synthesize(len(tts_tasks), sentence, previous)))
+
+        async def produce():
+            splitter = SentenceSplitter()
+            reply_parts = []
+            try:
+                stream = await self.clients.openai.chat.completions.create(
+                    model=gpt_model,
+                    messages=messages,
+                    temperature=0.5,
+                    stream=True,
+                    timeout=OPENAI_CHAT_TIMEOUT
+                )
+                async for chunk in stream:
+                    token = chunk.choices[0].delta.content if chunk.choices else None
+                    if not token:
+                        continue
+                    reply_parts.append(token)
+                    await queue.put({"type": "token", "content": token})
+                    for sentence in splitter.feed(token):
+                        schedule_tts(sentence)
+
+                rest = splitter.flush()
+                if rest:
+                    schedule_tts(rest)
+                if tts_tasks:
+                    await tts_tasks[-1]
+                logger.info(f"✅ Total chat stream time: {time.time() - start_time:.2f} sec")
+                await queue.put({"type": "done", "content": "".join(reply_parts)})
+            except Exception as e:
+                logger.exception("❌ Chat stream failed")
+                await queue.put({"type": "error", "message": str(e)})
+            finally:
+                await queue.put(None)
+
+        start_time = time.time()
+        logger.info("💬 Chat stream API called")
+        producer = asyncio.create_task(produce())
+        try:
+            while True:
+                event = await queue.get()
+                if event is None:
+                    break
+                yield event
+        finally:
+            # client disconnected or stream finished: stop remaining work
+            for task in [producer, *tts_tasks]:
+                if not task.done():
+                    task.cancel()
+            await asyncio.gather(producer, *tts_tasks, return_exceptions=True)
+
+    async def _translate(self, text: str, target_language: str) -> str:
+        prompt = f"translate below sentences to {target_language}. \n\n{text}"
+        response = await self.clients.openai.chat.completions.create(
+            model=self.translate_model,
+            messages=[{"role": "user", "content": prompt}],
+            timeout=OPENAI_CHAT_TIMEOUT
+        )
+        return response.choices[0].message.content
+
     async def translate_text(self, text: str, target_language: str) -> str:
         try:
-            prompt = f"translate below sentences to {target_language}. \n\n{text}"
-            response = await client.chat.completions.create(
-                model=self.translate_model,
-                messages=[{"role": "user", "content": prompt}]
+            return await translation_cache_service.get_or_compute(
+                text,
+                target_language,
+                lambda: self._translate(text, target_language)
             )
-            translated_text = response.choices[0].message.content
-            return translated_text
 
         except Exception as e:
             raise HTTPException(status_code=500, detail=str(e))
 
     async def tts(self, text: str, voice: str = "nova"):
         try:
-            speech_response = await client.audio.speech.create(
+            speech_response = await self.clients.openai.audio.speech.create(
                 model="tts-1",
                 voice=voice,
-                input=text
+                input=text,
+                timeout=OPENAI_TTS_TIMEOUT
             )
             return speech_response
         except Exception as e:
             raise HTTPException(status_code=500, detail=str(e))
 
-    async def generate_openai_tts(self, text: str, voice: str = "nova") -> str:
+    async def generate_openai_tts(self, text: str, voice: str = "nova") -> bytes:
         """
-        Text-To-Speech: generate audio file from text
+        Text-To-Speech: generate audio from text
         :param text:
         :param voice:
-        :return: audio file name
+        :return: mp3 audio bytes
         """
-        filename = f"{uuid.uuid4()}.mp3"
         response = await self.tts(text, voice)
-        with open(filename, "wb") as f:
-            f.write(response.content)
-        return filename
+        return response.content
+
+    async def generate_openai_tts_url(self, text: str, voice: str = "nova") -> str:
+        """
+        Text-To-Speech with cache: reuse audio already generated for the same text and voice
+        :param text:
+        :param voice:
+        :return: public audio url
+        """
+        return await tts_cache_service.get_or_create(
+            text,
+            lambda: self.generate_openai_tts(text, voice),
+            voice=voice,
+            model="tts-1"
+        )
+
+    def _check_upload_size(self, audio_file: UploadFile) -> int:
+        size = audio_file.size
+        if size is None:
+            audio_file.file.seek(0, os.SEEK_END)
+            size = audio_file.file.tell()
+        if size > MAX_AUDIO_UPLOAD_BYTES:
+            raise HTTPException(
+                status_code=413, detail=f"Uploaded file is too large. Max {MAX_AUDIO_UPLOAD_BYTES} bytes"
+            )
+        return size
+
+    async def _preprocess_audio(self, audio_file: UploadFile, size: int, mono: np.ndarray | None = None) -> tuple:
+        """
+        Run the optional preprocessing stage (silence trim, downmix, resample)
+        :param audio_file:
+        :param size: upload size in bytes
+        :param mono: samples already decoded by the long audio check, so the upload is not decoded twice
+        :return: file tuple for the transcription API
+        """
+        original = (audio_file.filename, audio_file.file, audio_file.content_type)
+        if self.audio_preprocessor is None:
+            return original
+
+        preprocess_start = time.time()
+        if mono is not None:
+            processed = await audio_executor.run(self.audio_preprocessor.encode_wav, mono, TARGET_SAMPLE_RATE)
+        else:
+            data = await audio_file.read()
+            processed = await audio_executor.run(self.audio_preprocessor.process, data, audio_file.filename or "")
+        if processed is None:
+            audio_file.file.seek(0)
+            return original
+
+        logger.info(
+            f"🎛️ Audio preprocess: {size} -> {len(processed)} bytes, {time.time() - preprocess_start:.2f} sec"
+        )
+        name = os.path.splitext(audio_file.filename or "audio")[0] + ".wav"
+        return name, processed, "audio/wav"
 
     async def transcribe(self, audio_file: UploadFile = File(...), language: str = Form(None)):
         """
-        from audio file, generate text
+        from audio file, generate text.
+        The spooled upload file is passed to the API as is, so it is sent in chunks without reading it into memory
         :param audio_file:
         :param language:
         :return: text
         """
         try:
-            contents = await audio_file.read()
-            response = await client.audio.transcriptions.create(
-                model="whisper-1",
-                file=(audio_file.filename, contents),
-                language=language
-            )
-            return response.text
+            size = self._check_upload_size(audio_file)
+            audio_file.file.seek(0)
+            mono = None
+            if self.long_audio_transcriber is not None:
+                text, mono = await self.long_audio_transcriber.transcribe_upload(audio_file, language, size)
+                if text is not None:
+                    return text
+
+            upload = await self._preprocess_audio(audio_file, size, mono)
+            return await self.transcription_backend.transcribe(upload, language)
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(status_code=500, detail=str(e))
 
-    async def chat_response(self, payload: ChatRequest, current_user: User):
+    async def _timed(self, label: str, coro):
+        """
+        Await coro and log how long it took
+        :param label: log prefix
+        :param coro:
+        :return: result of coro
+        """
+        stage_start = time.time()
+        result = await coro
+        logger.info(f"{label}: {time.time() - stage_start:.2f} sec")
+        return result
+
+    async def _run_stages(self, **stages) -> dict:
+        """
+        Run independent stages concurrently.
+        If one stage fails, the other stages still running are cancelled and the error is raised.
+        :param stages: stage name -> coroutine
+        :return: stage name -> result
+        """
+        tasks = {name: asyncio.create_task(coro) for name, coro in stages.items()}
+        try:
+            done, pending = await asyncio.wait(tasks.values(), return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                if task.exception() is not None:
+                    raise task.exception()
+            return {name: task.result() for name, task in tasks.items()}
+        finally:
+            pending = [task for task in tasks.values() if not task.done()]
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+    async def chat_response(
+            self,
+            payload: ChatRequest,
+            current_user: User,
+            summary: ConversationSummary | None = None):
         try:
             start_time = time.time()
             logger.info("💬 Chat API called")
             # Call OpenAI
-            openai_start = time.time()
-            reply = await self.chat_with_history(payload, current_user)
-            logger.info(f"🧠 OpenAI response time: {time.time() - openai_start:.2f} sec")
+            reply = await self._timed("🧠 OpenAI response time", self.chat_with_history(payload, current_user, summary))
 
-            # Translate
-            translate_start = time.time()
-            translated_text = await self.translate_text(reply, payload.language)
-            logger.info(f"🌍 Translation time: {time.time() - translate_start:.2f} sec")
+            # Translate and TTS only depend on reply
+            def translate():
+                return self._timed("🌍 Translation time", self.translate_text(reply, payload.language))
 
-            # TTS
-            tts_start = time.time()
-            mp3_file = await self.generate_openai_tts(reply)
-            logger.info(f"🔊 TTS time: {time.time() - tts_start:.2f} sec")
-            audio_url = await self.file_storage_service.upload_to_supabase_async(mp3_file)
+            def tts():
+                return self._timed("🔊 TTS time", self.generate_openai_tts_url(reply))
+
+            if CHAT_PIPELINE_ENABLED:
+                results = await self._run_stages(translate=translate(), audio=tts())
+                translated_text, audio_url = results["translate"], results["audio"]
+            else:
+                translated_text = await translate()
+                audio_url = await tts()
             logger.info(f"✅ Total chat endpoint time: {time.time() - start_time:.2f} sec")
 
             return {
@@ -176,24 +426,64 @@ class OpenAIService:
             logger.info(f"🧠 OpenAI chat time: {time.time() - chat_start:.2f} sec")
 
             tts_start = time.time()
-            # 3. TTS
-            speech_response = await self.tts(reply_text)
+            # 3. TTS: open the speech stream before responding so errors still become 500
+            speech_stream = self.clients.openai.audio.speech.with_streaming_response.create(
+                model="tts-1",
+                voice="nova",
+                input=reply_text,
+                timeout=OPENAI_TTS_TIMEOUT
+            )
+            speech_response = await speech_stream.__aenter__()
+            logger.info(f"🧠 OpenAI tts first response time: {time.time() - tts_start:.2f} sec")
 
-            # ToDo save audio stream to audio file and upload to storage
-            import base64
             reply_text_b64 = base64.b64encode(reply_text.encode("utf-8")).decode("ascii")
-            audio_byte = await speech_response.aread()
+            # tee of the streamed audio, uploaded to storage after the response is sent
+            audio_chunks: list[bytes] | None = [] if VOICE_CHAT_PERSIST_AUDIO else None
+            completed = False
+            closed = False
 
-            logger.info(f"🧠 OpenAI tts time: {time.time() - tts_start:.2f} sec")
-            logger.info(f"✅ Total chat endpoint time: {time.time() - start_time:.2f} sec")
+            async def close_stream():
+                # runs once: after the body, or from the background task if the body was never iterated
+                nonlocal closed
+                if closed:
+                    return
+                closed = True
+                await speech_stream.__aexit__(None, None, None)
+
+            async def stream_audio():
+                nonlocal completed
+                try:
+                    async for chunk in speech_response.iter_bytes(AUDIO_STREAM_CHUNK_SIZE):
+                        if audio_chunks is not None:
+                            audio_chunks.append(chunk)
+                        yield chunk
+                    completed = True
+                    logger.info(f"🧠 OpenAI tts time: {time.time() - tts_start:.2f} sec")
+                    logger.info(f"✅ Total chat endpoint time: {time.time() - start_time:.2f} sec")
+                finally:
+                    await close_stream()
+
+            async def finish():
+                # the client may disconnect before the body starts: the upstream response is released here then
+                await close_stream()
+                if audio_chunks is None or not completed:
+                    return
+                try:
+                    audio_url = await self.file_storage_service.upload_bytes_async(b"".join(audio_chunks))
+                    logger.info(f"☁️ Voice chat audio saved: {audio_url}")
+                except Exception:
+                    logger.exception("Failed to save voice chat audio")
 
             # 4. Return both text and audio
             return StreamingResponse(
-                io.BytesIO(audio_byte),
+                stream_audio(),
                 media_type="audio/mpeg",
-                headers={"X-Reply-Text": reply_text_b64}
+                headers={"X-Reply-Text": reply_text_b64},
+                background=BackgroundTask(finish)
             )
 
+        except HTTPException:
+            raise
         except Exception as e:
             import traceback
             logger.error("Exception occurred")
@@ -0,0 +1,117 @@
+import hmac
+import logging
+import os
+
+from dotenv import load_dotenv
+
+from app.utils.lru_cache import LRUCache
+
+try:
+    import redis.asyncio as redis
+except ImportError:
+    redis = None
+
+load_dotenv()
+# "memory": per process, for a single worker. "redis": shared by all workers (any Redis protocol server)
+OTP_STORE = os.getenv("OTP_STORE", "memory")
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+OTP_TTL_SECONDS = int(os.getenv("OTP_TTL_SECONDS", str(30 * 60)))
+# wrong codes allowed before the code is discarded
+OTP_MAX_ATTEMPTS = int(os.getenv("OTP_MAX_ATTEMPTS", "5"))
+OTP_MEMORY_MAX_ENTRIES = int(os.getenv("OTP_MEMORY_MAX_ENTRIES", "100000"))
+logger = logging.getLogger(__name__)
+
+
+class InMemoryOtpStore:
+    """One-time codes in process memory. Entries expire after the ttl"""
+
+    def __init__(self, max_attempts: int = OTP_MAX_ATTEMPTS, maxsize: int = OTP_MEMORY_MAX_ENTRIES):
+        self.max_attempts = max_attempts
+        self._codes = LRUCache(maxsize)
+
+    async def issue(self, user_id: str, code: str, ttl: int = OTP_TTL_SECONDS):
+        """Store code for user, replacing a previous one"""
+        self._codes.set(user_id, {"code": code, "attempts": 0}, ttl)
+
+    async def verify(self, user_id: str, code: str) -> bool:
+        """
+        A correct code is consumed. After max_attempts wrong codes the code is discarded
+        :param user_id:
+        :param code:
+        :return: True if code matches the unexpired code of user
+        """
+        entry = self._codes.get(user_id)
+        if entry is None:
+            return False
+        if hmac.compare_digest(entry["code"], code):
+            self._codes.pop(user_id)
+            return True
+        # mutate in place: set() would extend the expiry
+        entry["attempts"] += 1
+        if entry["attempts"] >= self.max_attempts:
+            self._codes.pop(user_id)
+        return False
+
+    async def close(self):
+        pass
+
+
+class RedisOtpStore:
+    """One-time codes in Redis, shared by all workers. Redis expires the keys"""
+
+    # check and count in one step so concurrent guesses can't exceed max attempts
+    VERIFY_SCRIPT = """
+    local code = redis.call('HGET', KEYS[1], 'code')
+    if not code then return 0 end
+    if code == ARGV[1] then
+        redis.call('DEL', KEYS[1])
+        return 1
+    end
+    if redis.call('HINCRBY', KEYS[1], 'attempts', 1) >= tonumber(ARGV[2]) then
+        redis.call('DEL', KEYS[1])
+    end
+    return 0
+    """
+
+    def __init__(self, url: str = REDIS_URL, max_attempts: int = OTP_MAX_ATTEMPTS):
+        if redis is None:
+            raise RuntimeError("OTP_STORE=redis requires the redis package")
+        self.max_attempts = max_attempts
+        self.client = redis.from_url(url, decode_responses=True)
+        self._verify = self.client.register_script(self.VERIFY_SCRIPT)
+
+    @staticmethod
+    def _key(user_id: str) -> str:
+        return f"otp:{user_id}"
+
+    async def issue(self, user_id: str, code: str, ttl: int = OTP_TTL_SECONDS):
+        """Store code for user, replacing a previous one"""
+        key = self._key(user_id)
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.delete(key)
+            pipe.hset(key, mapping={"code": code, "attempts": 0})
+            pipe.expire(key, ttl)
+            await pipe.execute()
+
+    async def verify(self, user_id: str, code: str) -> bool:
+        """
+        A correct code is consumed. After max_attempts wrong codes the code is discarded
+        :param user_id:
+        :param code:
+        :return: True if code matches the unexpired code of user
+        """
+        return bool(await self._verify(keys=[self._key(user_id)], args=[code, self.max_attempts]))
+
+    async def close(self):
+        await self.client.aclose()
+
+
+def create_otp_store():
+    if OTP_STORE == "redis":
+        return RedisOtpStore()
+    if OTP_STORE != "memory":
+        raise ValueError(f"Unknown OTP_STORE: {OTP_STORE}")
+    return InMemoryOtpStore()
+
+
+otp_store = create_otp_store()
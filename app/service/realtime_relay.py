@@ -0,0 +1,344 @@
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+
+import websockets
+from dotenv import load_dotenv
+from fastapi import WebSocket, WebSocketDisconnect
+from starlette.websockets import WebSocketState
+from websockets.exceptions import ConnectionClosed
+from websockets.protocol import State
+
+load_dotenv()
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+# override to point the relay at a local fake upstream server
+OPENAI_REALTIME_URL = os.getenv(
+    "OPENAI_REALTIME_URL", "wss://api.openai.com/v1/realtime?model=gpt-4o-realtime-preview-2024-12-17"
+)
+REALTIME_HEADERS = {
+    "Authorization": f"Bearer {OPENAI_API_KEY}",
+    "OpenAI-Beta": "realtime=v1"
+}
+# max messages waiting in each direction
+REALTIME_QUEUE_SIZE = int(os.getenv("REALTIME_QUEUE_SIZE", "64"))
+# when a queue is full, audio frames are "drop"ped or the sender is blocked ("block"). text always blocks
+REALTIME_AUDIO_OVERFLOW = os.getenv("REALTIME_AUDIO_OVERFLOW", "drop")
+# upstream connections opened ahead of time. 0 disables
+REALTIME_PREWARM = int(os.getenv("REALTIME_PREWARM", "0"))
+REALTIME_PREWARM_MAX_IDLE_SECONDS = float(os.getenv("REALTIME_PREWARM_MAX_IDLE_SECONDS", "60"))
+# merge client audio frames arriving within this window into one upstream message. 0 disables
+REALTIME_COALESCE_MS = float(os.getenv("REALTIME_COALESCE_MS", "0"))
+REALTIME_COALESCE_MAX_BYTES = int(os.getenv("REALTIME_COALESCE_MAX_BYTES", "32768"))
+# when one side closes, messages still queued for the other side are delivered for up to this long
+REALTIME_DRAIN_TIMEOUT_SECONDS = float(os.getenv("REALTIME_DRAIN_TIMEOUT_SECONDS", "2"))
+logger = logging.getLogger(__name__)
+
+
+class RelayChannel:
+    """Bounded queue for one direction of the relay with throughput and latency counters"""
+
+    def __init__(self, name: str, maxsize: int = REALTIME_QUEUE_SIZE, drop_audio: bool = True):
+        self.name = name
+        self.drop_audio = drop_audio
+        # None marks the end of the stream
+        self.queue: asyncio.Queue[tuple[float, bytes | str | None]] = asyncio.Queue(maxsize)
+        self.messages = 0
+        self.bytes = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self._pending: tuple[float, bytes | str] | None = None
+
+    async def put(self, message: bytes | str):
+        if self.drop_audio and isinstance(message, bytes) and self.queue.full():
+            # stale audio is worse than a gap. never drop text (control events)
+            self.dropped += 1
+            return
+        await self.queue.put((time.perf_counter(), message))
+
+    async def close(self):
+        """Mark the end of the stream. get returns None as message after everything queued before"""
+        await self.queue.put((time.perf_counter(), None))
+
+    async def get(self) -> tuple[float, bytes | str | None]:
+        if self._pending is not None:
+            item, self._pending = self._pending, None
+            return item
+        return await self.queue.get()
+
+    async def get_batch(self, window: float, max_bytes: int) -> tuple[float, bytes | str | None]:
+        """
+        Merge audio frames queued within window seconds of the first one.
+        Text or the end of the stream ends the batch and is kept for the next get.
+        :param window: seconds. 0 disables merging
+        :param max_bytes: a batch stops growing once it reaches this size
+        :return: (enqueue time of the first frame, message)
+        """
+        enqueued_at, message = await self.get()
+        if window <= 0 or not isinstance(message, bytes):
+            return enqueued_at, message
+
+        parts = [message]
+        size = len(message)
+        deadline = enqueued_at + window
+        while size < max_bytes:
+            try:
+                # take what is queued without a wait_for per frame, which can't keep up with a fast sender
+                item = self.queue.get_nowait()
+            except asyncio.QueueEmpty:
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            if not isinstance(item[1], bytes):
+                self._pending = item
+                break
+            parts.append(item[1])
+            size += len(item[1])
+
+        self.coalesced += len(parts) - 1
+        return enqueued_at, parts[0] if len(parts) == 1 else b"".join(parts)
+
+    def record(self, enqueued_at: float, message: bytes | str):
+        latency = time.perf_counter() - enqueued_at
+        self.messages += 1
+        self.bytes += len(message)
+        self.total_latency += latency
+        self.max_latency = max(self.max_latency, latency)
+
+    def stats(self) -> dict:
+        return {
+            "messages": self.messages,
+            "bytes": self.bytes,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "queued": self.queue.qsize(),
+            "avgLatencyMs": self.total_latency / self.messages * 1000 if self.messages else 0.0,
+            "maxLatencyMs": self.max_latency * 1000,
+        }
+
+
+class RelayMetrics:
+    """Totals over all relay connections of this worker"""
+
+    def __init__(self):
+        self.active = 0
+        self.completed = 0
+        self.totals = {
+            direction: {"messages": 0, "bytes": 0, "dropped": 0, "coalesced": 0} for direction in ("clientToUpstream", "upstreamToClient")
+        }
+
+    def finish(self, channels: dict[str, RelayChannel]):
+        self.active -= 1
+        self.completed += 1
+        for direction, channel in channels.items():
+            totals = self.totals[direction]
+            totals["messages"] += channel.messages
+            totals["bytes"] += channel.bytes
+            totals["dropped"] += channel.dropped
+            totals["coalesced"] += channel.coalesced
+
+    def stats(self) -> dict:
+        return {"active": self.active, "completed": self.completed, **self.totals}
+
+
+relay_metrics = RelayMetrics()
+echo_metrics = RelayMetrics()
+
+
+class LoopbackUpstream:
+    """Upstream stand-in that sends every message straight back. Used by /ws/echo"""
+
+    def __init__(self):
+        self._queue: asyncio.Queue = asyncio.Queue()
+
+    async def send(self, message: bytes | str):
+        await self._queue.put(message)
+
+    async def close(self):
+        await self._queue.put(None)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> bytes | str:
+        message = await self._queue.get()
+        if message is None:
+            raise StopAsyncIteration
+        return message
+
+
+class RealtimeRelay:
+    """
+    Relay messages between a client WebSocket and an upstream WebSocket.
+    Each direction has a reader and a writer joined by a bounded RelayChannel.
+    When a side closes, the messages already queued for the other side are delivered (up to drain_timeout),
+    then the other tasks are cancelled and both connections are closed.
+    Client audio frames can be merged before they are sent upstream (coalesce_ms).
+    """
+
+    def __init__(
+            self,
+            websocket: WebSocket,
+            upstream,
+            drop_audio: bool = REALTIME_AUDIO_OVERFLOW == "drop",
+            coalesce_ms: float = REALTIME_COALESCE_MS,
+            coalesce_max_bytes: int = REALTIME_COALESCE_MAX_BYTES,
+            drain_timeout: float = REALTIME_DRAIN_TIMEOUT_SECONDS,
+            metrics: RelayMetrics = relay_metrics):
+        self.websocket = websocket
+        self.upstream = upstream
+        self.coalesce_window = coalesce_ms / 1000
+        self.coalesce_max_bytes = coalesce_max_bytes
+        self.drain_timeout = drain_timeout
+        self.metrics = metrics
+        self.up = RelayChannel("clientToUpstream", drop_audio=drop_audio)
+        self.down = RelayChannel("upstreamToClient", drop_audio=drop_audio)
+
+    async def _client_reader(self):
+        while True:
+            message = await self.websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                await self.up.close()
+                return
+            data = message.get("bytes")
+            await self.up.put(data if data is not None else message.get("text", ""))
+
+    async def _upstream_writer(self):
+        while True:
+            enqueued_at, message = await self.up.get_batch(self.coalesce_window, self.coalesce_max_bytes)
+            if message is None:
+                return
+            await self.upstream.send(message)
+            self.up.record(enqueued_at, message)
+
+    async def _upstream_reader(self):
+        async for message in self.upstream:
+            await self.down.put(message)
+        await self.down.close()
+
+    async def _client_writer(self):
+        while True:
+            enqueued_at, message = await self.down.get()
+            if message is None:
+                return
+            if isinstance(message, bytes):
+                await self.websocket.send_bytes(message)
+            else:
+                await self.websocket.send_text(message)
+            self.down.record(enqueued_at, message)
+
+    async def run(self):
+        self.metrics.active += 1
+        start_time = time.perf_counter()
+        client_reader = asyncio.create_task(self._client_reader(), name="client_reader")
+        upstream_writer = asyncio.create_task(self._upstream_writer(), name="upstream_writer")
+        upstream_reader = asyncio.create_task(self._upstream_reader(), name="upstream_reader")
+        client_writer = asyncio.create_task(self._client_writer(), name="client_writer")
+        tasks = [client_reader, upstream_writer, upstream_reader, client_writer]
+        writers = {client_reader: upstream_writer, upstream_reader: client_writer}
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            draining = []
+            for task in done:
+                error = task.exception()
+                if error is None and task in writers:
+                    # the side closed normally: deliver what it sent before closing
+                    draining.append(writers[task])
+                elif error is not None and not isinstance(error, (ConnectionClosed, WebSocketDisconnect)):
+                    logger.warning(f"Realtime relay {task.get_name()} failed: {error!r}")
+            if draining:
+                await asyncio.wait(draining, timeout=self.drain_timeout)
+        finally:
+            for task in tasks:
+                task.cancel()
+            # bookkeeping first: the awaits below may be interrupted if this task itself is cancelled
+            self.metrics.finish({self.up.name: self.up, self.down.name: self.down})
+            logger.info(
+                f"🔁 Realtime relay closed after {time.perf_counter() - start_time:.1f} sec: "
+                f"up {self.up.stats()}, down {self.down.stats()}"
+            )
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await self._close()
+
+    async def _close(self):
+        try:
+            await self.upstream.close()
+        except Exception:
+            pass
+        if self.websocket.client_state == WebSocketState.CONNECTED:
+            try:
+                await self.websocket.close()
+            except Exception:
+                pass
+
+
+class UpstreamConnectionPool:
+    """
+    Keep a few upstream connections opened ahead of time so a new client skips the TCP/TLS/WebSocket handshake.
+    Realtime sessions are stateful, so each connection is handed out once and never reused.
+    """
+
+    def __init__(
+            self,
+            url: str = OPENAI_REALTIME_URL,
+            headers: dict = None,
+            prewarm: int = REALTIME_PREWARM,
+            max_idle: float = REALTIME_PREWARM_MAX_IDLE_SECONDS):
+        self.url = url
+        self.headers = headers if headers is not None else REALTIME_HEADERS
+        self.prewarm = prewarm
+        self.max_idle = max_idle
+        self.warm_hits = 0
+        self.cold_connects = 0
+        self._idle: deque = deque()
+        self._refill_task: asyncio.Task | None = None
+
+    async def _connect(self):
+        return await websockets.connect(self.url, additional_headers=self.headers)
+
+    async def acquire(self):
+        while self._idle:
+            opened_at, connection = self._idle.popleft()
+            if time.monotonic() - opened_at < self.max_idle and connection.state is State.OPEN:
+                self.warm_hits += 1
+                self.start()
+                return connection
+            asyncio.create_task(connection.close())
+
+        self.cold_connects += 1
+        self.start()
+        return await self._connect()
+
+    def start(self):
+        """Open connections in the background until prewarm connections are idle"""
+        if self.prewarm and (self._refill_task is None or self._refill_task.done()):
+            self._refill_task = asyncio.create_task(self._refill())
+
+    async def _refill(self):
+        while len(self._idle) < self.prewarm:
+            try:
+                connection = await self._connect()
+            except Exception as e:
+                logger.warning(f"Failed to prewarm realtime connection: {e!r}")
+                return
+            self._idle.append((time.monotonic(), connection))
+
+    async def close(self):
+        if self._refill_task is not None:
+            self._refill_task.cancel()
+        while self._idle:
+            _, connection = self._idle.popleft()
+            await connection.close()
+
+    def stats(self) -> dict:
+        return {"idle": len(self._idle), "warmHits": self.warm_hits, "coldConnects": self.cold_connects}
+
+
+upstream_pool = UpstreamConnectionPool()
@@ -0,0 +1,144 @@
+import asyncio
+import logging
+import os
+import uuid
+from datetime import datetime
+
+from dotenv import load_dotenv
+
+from app.service.file_storage_service import FileStorageService
+from app.utils.executors import recording_executor
+
+load_dotenv()
+RECORDINGS_DIR = os.getenv("RECORDINGS_DIR", "recordings")
+# chunks are collected in memory and written in blocks of this size
+RECORDING_FLUSH_BYTES = int(os.getenv("RECORDING_FLUSH_BYTES", str(64 * 1024)))
+# while the disk is behind, a recording buffers up to this size before its client is slowed down
+RECORDING_MAX_BUFFER_BYTES = int(os.getenv("RECORDING_MAX_BUFFER_BYTES", str(1024 * 1024)))
+# start a new file once the current one reaches this size. 0 disables rotation
+RECORDING_ROTATE_BYTES = int(os.getenv("RECORDING_ROTATE_BYTES", "0"))
+RECORDING_UPLOAD_ENABLED = os.getenv("RECORDING_UPLOAD_ENABLED", "false").lower() == "true"
+RECORDING_BUCKET = os.getenv("RECORDING_BUCKET", "ai-speak")
+logger = logging.getLogger(__name__)
+
+
+class RecordingSink:
+    """
+    Buffered writer for one incoming audio stream.
+    All file IO runs on the recording writer thread; at most one write per recording is in flight,
+    so a slow disk delays this recording only and never the event loop.
+    """
+
+    def __init__(
+            self,
+            directory: str = RECORDINGS_DIR,
+            prefix: str = "audio",
+            extension: str = "webm",
+            content_type: str = "audio/webm",
+            flush_bytes: int = RECORDING_FLUSH_BYTES,
+            max_buffer_bytes: int = RECORDING_MAX_BUFFER_BYTES,
+            rotate_bytes: int = RECORDING_ROTATE_BYTES,
+            storage: FileStorageService | None = None,
+            bucket: str = RECORDING_BUCKET):
+        timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        self.name = f"{prefix}_{timestamp}_{uuid.uuid4().hex[:8]}"
+        self.directory = directory
+        self.extension = extension
+        self.content_type = content_type
+        self.flush_bytes = flush_bytes
+        self.max_buffer_bytes = max_buffer_bytes
+        self.rotate_bytes = rotate_bytes
+        self.storage = storage
+        self.bucket = bucket
+        self.paths: list[str] = []
+        self.bytes = 0
+        self.backpressure_waits = 0
+        self._chunks: list[bytes] = []
+        self._buffered = 0
+        self._pending: asyncio.Task | None = None
+        self._closing: asyncio.Task | None = None
+        self._file = None
+        self._file_bytes = 0
+
+    async def write(self, data: bytes):
+        self._chunks.append(data)
+        self._buffered += len(data)
+        self.bytes += len(data)
+        if self._buffered < self.flush_bytes:
+            return
+        if self._pending is not None and not self._pending.done():
+            if self._buffered < self.max_buffer_bytes:
+                return
+            # the disk is behind: wait for it instead of growing the buffer
+            self.backpressure_waits += 1
+        await self._flush()
+
+    async def _flush(self):
+        if self._pending is not None:
+            pending, self._pending = self._pending, None
+            await pending
+        if not self._chunks:
+            return
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        self._buffered = 0
+        self._pending = asyncio.create_task(recording_executor.run(self._write_sync, data))
+
+    def _write_sync(self, data: bytes):
+        view = memoryview(data)
+        while view:
+            if self._file is None:
+                os.makedirs(self.directory, exist_ok=True)
+                suffix = f"_{len(self.paths)}" if self.rotate_bytes else ""
+                path = os.path.join(self.directory, f"{self.name}{suffix}.{self.extension}")
+                self._file = open(path, "wb")
+                self._file_bytes = 0
+                self.paths.append(path)
+            size = min(len(view), self.rotate_bytes - self._file_bytes) if self.rotate_bytes else len(view)
+            self._file.write(view[:size])
+            self._file_bytes += size
+            view = view[size:]
+            if self.rotate_bytes and self._file_bytes >= self.rotate_bytes:
+                self._close_sync()
+
+    def _close_sync(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    @staticmethod
+    def _read_sync(path: str) -> bytes:
+        with open(path, "rb") as f:
+            return f.read()
+
+    async def close(self) -> list[str]:
+        """
+        Write what is buffered, close the file and upload the finished files when storage is set
+        :return: local paths, or public urls when uploaded
+        """
+        if self._closing is None:
+            self._closing = asyncio.create_task(self._finalize())
+        # a cancelled connection handler must not leave the recording half written
+        return await asyncio.shield(self._closing)
+
+    async def _finalize(self) -> list[str]:
+        try:
+            await self._flush()
+            # the second call waits for the write submitted by the first
+            await self._flush()
+        finally:
+            await recording_executor.run(self._close_sync)
+        logger.info(f"🎙️ Recording {self.name} finished: {self.bytes} bytes, {len(self.paths)} file(s)")
+
+        if self.storage is None:
+            return self.paths
+        urls = []
+        for path in self.paths:
+            data = await recording_executor.run(self._read_sync, path)
+            urls.append(await self.storage.upload_bytes_async(
+                data,
+                filename=f"recordings/{os.path.basename(path)}",
+                bucket=self.bucket,
+                content_type=self.content_type
+            ))
+        return urls
@@ -0,0 +1,166 @@
+import asyncio
+import logging
+import os
+import time
+
+from dotenv import load_dotenv
+from sqlalchemy import select, func, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db import async_session
+from app.dtos.openai_dto import ChatMessages, ConversationSummary
+from app.models import Conversation, Message
+from app.service.openai_service import OpenAIService
+
+load_dotenv()
+SUMMARY_ENABLED = os.getenv("SUMMARY_ENABLED", "true").lower() == "true"
+# fold messages into the summary once this many are not summarized yet
+SUMMARY_EVERY_MESSAGES = int(os.getenv("SUMMARY_EVERY_MESSAGES", "10"))
+# newest messages always sent verbatim, never summarized
+SUMMARY_KEEP_RECENT_MESSAGES = int(os.getenv("SUMMARY_KEEP_RECENT_MESSAGES", "6"))
+SUMMARY_MODEL = os.getenv("SUMMARY_MODEL", "gpt-4o-mini")
+logger = logging.getLogger(__name__)
+
+
+class SummaryService:
+    """
+    Rolling summary per conversation, stored on the Conversation row.
+    After messages are saved, older messages are folded into the summary in the background,
+    so a chat sends summary + recent turns instead of the whole transcript.
+    """
+
+    def __init__(
+            self,
+            openai_service: OpenAIService = None,
+            every: int = SUMMARY_EVERY_MESSAGES,
+            keep_recent: int = SUMMARY_KEEP_RECENT_MESSAGES,
+            model: str = SUMMARY_MODEL):
+        self.openai_service = openai_service or OpenAIService()
+        self.every = every
+        self.keep_recent = keep_recent
+        self.model = model
+        self.updates = 0
+        self._tasks: dict[str, asyncio.Task] = {}
+
+    async def get_summary(
+            self,
+            conversation_id: str,
+            user_id: str,
+            session: AsyncSession) -> ConversationSummary | None:
+        """
+        :param conversation_id:
+        :param user_id: owner of the conversation
+        :param session:
+        :return: summary with the stored messages it does not cover,
+            or None if there is none yet or the conversation is not the user's
+        """
+        result = await session.execute(
+            select(Conversation.summary, Conversation.summary_message_count)
+            .where(Conversation.id == conversation_id, Conversation.user_id == user_id)
+        )
+        row = result.one_or_none()
+        if row is None or not row.summary:
+            return None
+
+        # loaded here rather than sliced from the client's history, which may be trimmed or shifted
+        result = await session.execute(
+            select(Message.role, Message.content)
+            .where(Message.conversation_id == conversation_id)
+            .order_by(Message.created_at.asc(), Message.id.asc())
+            .offset(row.summary_message_count)
+        )
+        recent = [{"role": role, "content": content} for role, content in result.all()]
+        return {"summary": row.summary, "message_count": row.summary_message_count, "recent": recent}
+
+    def schedule_update(self, conversation_id: str):
+        """Update the summary in the background if enough new messages were saved. Returns immediately"""
+        if not SUMMARY_ENABLED:
+            return
+        conversation_id = str(conversation_id)
+        if conversation_id in self._tasks:
+            # the running update picks up these messages or the next save triggers another one
+            return
+        task = asyncio.create_task(self._update_safely(conversation_id))
+        self._tasks[conversation_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(conversation_id, None))
+
+    async def _update_safely(self, conversation_id: str):
+        try:
+            await self.update(conversation_id)
+        except Exception:
+            logger.exception(f"Failed to update summary of conversation {conversation_id}")
+
+    async def update(self, conversation_id: str) -> bool:
+        """
+        Fold messages older than the keep_recent newest ones into the summary,
+        once at least `every` of them are not summarized yet
+        :param conversation_id:
+        :return: True if the summary was updated
+        """
+        async with async_session() as session:
+            result = await session.execute(
+                select(
+                    Conversation.summary,
+                    Conversation.summary_message_count,
+                    select(func.count(Message.id))
+                    .where(Message.conversation_id == conversation_id)
+                    .scalar_subquery()
+                ).where(Conversation.id == conversation_id)
+            )
+            row = result.one_or_none()
+            if row is None:
+                return False
+            summary, summarized, total = row
+            target = total - self.keep_recent
+            if target - summarized < self.every:
+                return False
+
+            result = await session.execute(
+                select(Message.role, Message.content)
+                .where(Message.conversation_id == conversation_id)
+                .order_by(Message.created_at.asc(), Message.id.asc())
+                .offset(summarized)
+                .limit(target - summarized)
+            )
+            new_messages = result.all()
+
+        # no connection is held while the model writes the summary
+        start_time = time.time()
+        new_summary = await self.openai_service.chat_with_text(self.model, self._build_prompt(summary, new_messages))
+
+        async with async_session() as session:
+            # another worker may have updated it meanwhile: only write over the state this was based on
+            result = await session.execute(
+                update(Conversation)
+                .where(Conversation.id == conversation_id, Conversation.summary_message_count == summarized)
+                .values(summary=new_summary, summary_message_count=target)
+            )
+            await session.commit()
+            if result.rowcount == 0:
+                return False
+
+        self.updates += 1
+        logger.info(
+            f"📝 Summary of conversation {conversation_id} now covers {target}/{total} messages: "
+            f"{time.time() - start_time:.2f} sec"
+        )
+        return True
+
+    @staticmethod
+    def _build_prompt(summary: str | None, messages) -> ChatMessages:
+        transcript = "\n".join(f"{role}: {content}" for role, content in messages)
+        prompt = f"""
+        Update the summary of a conversation between a user and an AI assistant with the new messages below.
+        Keep facts, names, preferences and open questions that later replies may need. Drop small talk.
+        Write it in the language of the conversation, at most about 200 words. Reply with the summary only.
+
+        Current summary:
+        {summary or "(none)"}
+
+        New messages:
+        {transcript}
+        """
+        return [{"role": "user", "content": prompt}]
+
+
+summary_service = SummaryService()
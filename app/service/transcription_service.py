@@ -0,0 +1,209 @@
+import asyncio
+import logging
+import os
+import re
+import time
+
+import numpy as np
+from dotenv import load_dotenv
+from fastapi import UploadFile
+
+from app.service.audio_preprocess_service import AudioPreprocessService, TARGET_SAMPLE_RATE, VAD_FRAME_MS
+from app.service.client_registry import ClientRegistry, client_registry, OPENAI_TRANSCRIBE_TIMEOUT
+from app.utils.executors import audio_executor
+
+load_dotenv()
+# "openai" or "fake" (local backend without API calls, for development and tests)
+TRANSCRIPTION_BACKEND = os.getenv("TRANSCRIPTION_BACKEND", "openai")
+LONG_AUDIO_ENABLED = os.getenv("LONG_AUDIO_ENABLED", "false").lower() == "true"
+# recordings longer than this are split and transcribed in parallel
+LONG_AUDIO_THRESHOLD_SECONDS = float(os.getenv("LONG_AUDIO_THRESHOLD_SECONDS", "120"))
+LONG_AUDIO_CHUNK_SECONDS = float(os.getenv("LONG_AUDIO_CHUNK_SECONDS", "60"))
+LONG_AUDIO_OVERLAP_SECONDS = float(os.getenv("LONG_AUDIO_OVERLAP_SECONDS", "1.5"))
+# a chunk ends at the quietest frame within this many seconds before the target length
+LONG_AUDIO_SEARCH_SECONDS = float(os.getenv("LONG_AUDIO_SEARCH_SECONDS", "10"))
+LONG_AUDIO_CONCURRENCY = int(os.getenv("LONG_AUDIO_CONCURRENCY", "4"))
+# lowest bitrate expected from clients (8 kbps). smaller uploads can't be long, so they are not even probed
+LONG_AUDIO_MIN_BYTES_PER_SECOND = int(os.getenv("LONG_AUDIO_MIN_BYTES_PER_SECOND", "1000"))
+MAX_OVERLAP_TOKENS = 30
+logger = logging.getLogger(__name__)
+
+
+class OpenAITranscriptionBackend:
+    def __init__(self, clients: ClientRegistry = client_registry):
+        self.clients = clients
+
+    async def transcribe(self, file: tuple, language: str | None, model: str = "whisper-1") -> str:
+        """
+        :param file: (filename, content, content_type)
+        :param language:
+        :param model:
+        :return: text
+        """
+        response = await self.clients.openai.audio.transcriptions.create(
+            model=model,
+            file=file,
+            language=language,
+            timeout=OPENAI_TRANSCRIBE_TIMEOUT
+        )
+        return response.text
+
+
+class FakeTranscriptionBackend:
+    """Local backend returning canned texts in call order. Without texts, it describes the received file"""
+
+    def __init__(self, texts: list[str] | None = None, delay: float = 0.0):
+        self.texts = texts
+        self.delay = delay
+        self.calls: list[tuple] = []
+
+    async def transcribe(self, file: tuple, language: str | None, model: str = "whisper-1") -> str:
+        index = len(self.calls)
+        self.calls.append(file)
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.texts:
+            return self.texts[index % len(self.texts)]
+        content = file[1]
+        if isinstance(content, (bytes, bytearray)):
+            return f"[{file[0]}: {len(content)} bytes]"
+        return f"[{file[0]}]"
+
+
+def create_transcription_backend():
+    if TRANSCRIPTION_BACKEND == "fake":
+        return FakeTranscriptionBackend()
+    return OpenAITranscriptionBackend()
+
+
+def merge_overlap(left: str, right: str, max_tokens: int = MAX_OVERLAP_TOKENS) -> str:
+    """
+    Join two transcripts of overlapping audio, dropping the words repeated at the start of right.
+    Texts without spaces (e.g. Japanese) are compared by character.
+    :param left:
+    :param right:
+    :param max_tokens: longest overlap to look for
+    :return: merged text
+    """
+    left, right = left.strip(), right.strip()
+    if not left or not right:
+        return left or right
+
+    spaced = " " in left or " " in right
+    left_tokens = left.split() if spaced else list(left)
+    right_tokens = right.split() if spaced else list(right)
+    min_tokens = 1 if spaced else 2
+
+    def normalize(tokens: list[str]) -> list[str]:
+        return [re.sub(r"[^\w]", "", token.lower()) for token in tokens]
+
+    overlap = 0
+    for k in range(min(len(left_tokens), len(right_tokens), max_tokens), min_tokens - 1, -1):
+        head = normalize(right_tokens[:k])
+        if any(head) and normalize(left_tokens[-k:]) == head:
+            overlap = k
+            break
+
+    rest = right_tokens[overlap:]
+    if not rest:
+        return left
+    return f"{left} {' '.join(rest)}" if spaced else left + "".join(rest)
+
+
+class LongAudioTranscriber:
+    """
+    Split long recordings at quiet points into overlapping chunks,
+    transcribe the chunks concurrently and stitch the texts back in order.
+    """
+
+    def __init__(
+            self,
+            backend=None,
+            preprocessor: AudioPreprocessService | None = None,
+            concurrency: int = LONG_AUDIO_CONCURRENCY):
+        self.backend = backend or create_transcription_backend()
+        self.preprocessor = preprocessor or AudioPreprocessService()
+        self.concurrency = concurrency
+
+    def split(self, mono: np.ndarray, sample_rate: int = TARGET_SAMPLE_RATE) -> list[tuple[int, int]]:
+        """
+        :param mono: samples
+        :param sample_rate:
+        :return: list of (start, end) sample ranges. consecutive ranges overlap
+        """
+        total = len(mono)
+        chunk = int(LONG_AUDIO_CHUNK_SECONDS * sample_rate)
+        overlap = int(LONG_AUDIO_OVERLAP_SECONDS * sample_rate)
+        search = int(LONG_AUDIO_SEARCH_SECONDS * sample_rate)
+        frame = sample_rate * VAD_FRAME_MS // 1000
+
+        ranges = []
+        start = 0
+        while total - start > chunk:
+            target = start + chunk
+            window_start = max(target - search, start + overlap + frame)
+            cut = self._quietest_point(mono, window_start, target, frame)
+            ranges.append((start, cut))
+            start = cut - overlap
+        ranges.append((start, total))
+        return ranges
+
+    @staticmethod
+    def _quietest_point(mono: np.ndarray, start: int, end: int, frame: int) -> int:
+        frame_count = (end - start) // frame
+        if frame_count <= 0:
+            return end
+        frames = mono[start:start + frame_count * frame].reshape(frame_count, frame)
+        energy = np.mean(frames ** 2, axis=1)
+        return start + int(np.argmin(energy)) * frame + frame // 2
+
+    async def transcribe_pcm(self, mono: np.ndarray, language: str | None, sample_rate: int = TARGET_SAMPLE_RATE) -> str:
+        ranges = self.split(mono, sample_rate)
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def transcribe_chunk(index: int, start: int, end: int) -> str:
+            async with semaphore:
+                wav = self.preprocessor.encode_wav(mono[start:end], sample_rate)
+                return await self.backend.transcribe((f"chunk_{index}.wav", wav, "audio/wav"), language)
+
+        texts = await asyncio.gather(*[transcribe_chunk(i, start, end) for i, (start, end) in enumerate(ranges)])
+        merged = ""
+        for text in texts:
+            merged = merge_overlap(merged, text)
+        return merged
+
+    async def transcribe_upload(
+            self,
+            audio_file: UploadFile,
+            language: str | None,
+            size: int) -> tuple[str | None, np.ndarray | None]:
+        """
+        Short uploads are recognized by size or container header without decoding.
+        Only uploads that may be long are decoded.
+        :param audio_file:
+        :param language:
+        :param size: upload size in bytes
+        :return: (text, None) for long audio. Otherwise (None, samples if they were decoded already, else None).
+            The file position is reset when no text is returned
+        """
+        if size < LONG_AUDIO_THRESHOLD_SECONDS * LONG_AUDIO_MIN_BYTES_PER_SECOND:
+            return None, None
+
+        start_time = time.time()
+        filename = audio_file.filename or ""
+        duration = await audio_executor.run(self.preprocessor.probe_duration, audio_file.file, filename)
+        if duration is not None and duration <= LONG_AUDIO_THRESHOLD_SECONDS:
+            return None, None
+
+        data = await audio_file.read()
+        mono = await audio_executor.run(self.preprocessor.to_pcm, data, filename)
+        if mono is None or len(mono) / TARGET_SAMPLE_RATE <= LONG_AUDIO_THRESHOLD_SECONDS:
+            await audio_file.seek(0)
+            return None, mono
+
+        text = await self.transcribe_pcm(mono, language)
+        logger.info(
+            f"🧩 Long audio transcribe: {len(mono) / TARGET_SAMPLE_RATE:.1f} sec audio, "
+            f"{time.time() - start_time:.2f} sec"
+        )
+        return text, None
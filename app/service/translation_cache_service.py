@@ -0,0 +1,185 @@
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Awaitable, Callable, Optional
+
+from dotenv import load_dotenv
+
+from app.utils.executors import cache_io_executor
+from app.utils.lru_cache import LRUCache
+
+load_dotenv()
+TRANSLATION_CACHE_MAX_ENTRIES = int(os.getenv("TRANSLATION_CACHE_MAX_ENTRIES", "2048"))
+TRANSLATION_CACHE_TTL_SECONDS = float(os.getenv("TRANSLATION_CACHE_TTL_SECONDS", "86400"))
+# e.g. translation_cache.sqlite3. empty means memory only
+TRANSLATION_CACHE_SQLITE_PATH = os.getenv("TRANSLATION_CACHE_SQLITE_PATH", "")
+TRANSLATION_CACHE_SQLITE_MAX_ROWS = int(os.getenv("TRANSLATION_CACHE_SQLITE_MAX_ROWS", "100000"))
+# expired rows are deleted and the row cap is enforced once per this many writes
+TRANSLATION_CACHE_SQLITE_PURGE_EVERY = int(os.getenv("TRANSLATION_CACHE_SQLITE_PURGE_EVERY", "100"))
+logger = logging.getLogger(__name__)
+
+
+class SqliteTranslationStore:
+    """
+    Persistent translation cache backend so cached translations survive restarts.
+    Expired rows are purged periodically on write; beyond max_rows, the rows closest to expiry are evicted.
+    """
+
+    def __init__(
+            self,
+            path: str,
+            max_rows: int = TRANSLATION_CACHE_SQLITE_MAX_ROWS,
+            purge_every: int = TRANSLATION_CACHE_SQLITE_PURGE_EVERY):
+        self.max_rows = max_rows
+        self.purge_every = purge_every
+        self.purged = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS translation_cache "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_translation_cache_expires_at ON translation_cache (expires_at)"
+            )
+            self._purge()
+            self._conn.commit()
+
+    def _purge(self):
+        """Delete expired rows, then the oldest rows beyond max_rows. Call with the lock held"""
+        deleted = self._conn.execute("DELETE FROM translation_cache WHERE expires_at <= ?", (time.time(),)).rowcount
+        # every entry has the same ttl, so the rows closest to expiry are the oldest
+        deleted += self._conn.execute(
+            "DELETE FROM translation_cache WHERE expires_at <= "
+            "(SELECT expires_at FROM translation_cache ORDER BY expires_at DESC LIMIT 1 OFFSET ?)",
+            (self.max_rows,)
+        ).rowcount
+        if deleted:
+            self.purged += deleted
+            logger.info(f"🧹 Translation cache store: purged {deleted} rows")
+
+    def _get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM translation_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] <= time.time():
+                self._conn.execute("DELETE FROM translation_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            return row[0]
+
+    def _set(self, key: str, value: str, ttl: float):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO translation_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, time.time() + ttl)
+            )
+            self._writes += 1
+            if self._writes % self.purge_every == 0:
+                self._purge()
+            self._conn.commit()
+
+    async def get(self, key: str) -> Optional[str]:
+        return await cache_io_executor.run(self._get, key)
+
+    async def set(self, key: str, value: str, ttl: float):
+        await cache_io_executor.run(self._set, key, value, ttl)
+
+
+class TranslationCacheService:
+    """
+    Memoize translations by normalized text and target language.
+    Concurrent identical requests share one upstream call (single flight).
+    """
+
+    def __init__(
+            self,
+            maxsize: int = TRANSLATION_CACHE_MAX_ENTRIES,
+            ttl: float = TRANSLATION_CACHE_TTL_SECONDS,
+            store: SqliteTranslationStore = None):
+        self.ttl = ttl
+        self.memory = LRUCache(maxsize, ttl)
+        self.store = store
+        self.store_hits = 0
+        self.deduplicated = 0
+        self._in_flight: dict[str, asyncio.Task] = {}
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        text = unicodedata.normalize("NFC", text)
+        return re.sub(r"\s+", " ", text).strip()
+
+    def cache_key(self, text: str, target_language: str) -> str:
+        raw = f"{target_language.strip().lower()}\x1f{self.normalize(text)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    async def get_or_compute(self, text: str, target_language: str, compute: Callable[[], Awaitable[str]]) -> str:
+        """
+        :param text:
+        :param target_language:
+        :param compute: coroutine function calling the translation API on a miss
+        :return: translated text
+        """
+        key = self.cache_key(text, target_language)
+        value = self.memory.get(key)
+        if value is not None:
+            return value
+
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.deduplicated += 1
+        else:
+            task = asyncio.create_task(self._load_or_compute(key, compute))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        # a cancelled caller must not cancel the call other callers are waiting for
+        return await asyncio.shield(task)
+
+    async def _load_or_compute(self, key: str, compute: Callable[[], Awaitable[str]]) -> str:
+        if self.store is not None:
+            try:
+                value = await self.store.get(key)
+            except Exception:
+                # e.g. cache io pool is busy: fall back to the translation API
+                logger.warning("Translation cache store is unavailable", exc_info=True)
+                value = None
+            if value is not None:
+                self.store_hits += 1
+                self.memory.set(key, value)
+                return value
+
+        value = await compute()
+        self.memory.set(key, value)
+        if self.store is not None:
+            try:
+                await self.store.set(key, value, self.ttl)
+            except Exception:
+                logger.exception("Failed to persist translation cache entry")
+        return value
+
+    def stats(self) -> dict:
+        return {
+            "memory": self.memory.stats(),
+            "store": {
+                "enabled": self.store is not None,
+                "hits": self.store_hits,
+                "purged": self.store.purged if self.store is not None else 0,
+            },
+            "deduplicated": self.deduplicated,
+        }
+
+
+translation_cache_service = TranslationCacheService(
+    store=SqliteTranslationStore(TRANSLATION_CACHE_SQLITE_PATH) if TRANSLATION_CACHE_SQLITE_PATH else None
+)
@@ -0,0 +1,94 @@
+import hashlib
+import logging
+import os
+from typing import Awaitable, Callable
+
+from dotenv import load_dotenv
+
+from app.service.file_storage_service import FileStorageService
+from app.utils.lru_cache import LRUCache
+
+load_dotenv()
+TTS_CACHE_MAX_ENTRIES = int(os.getenv("TTS_CACHE_MAX_ENTRIES", "1024"))
+# storage is only looked up for texts up to this length: stock phrases repeat, long free-form replies rarely do
+TTS_CACHE_LOOKUP_MAX_CHARS = int(os.getenv("TTS_CACHE_LOOKUP_MAX_CHARS", "200"))
+# a slow lookup counts as a miss instead of delaying the reply
+TTS_CACHE_LOOKUP_TIMEOUT_SECONDS = float(os.getenv("TTS_CACHE_LOOKUP_TIMEOUT_SECONDS", "0.5"))
+TTS_CACHE_FOLDER = "tts-cache"
+logger = logging.getLogger(__name__)
+
+
+class TtsCacheService:
+    """
+    Content-addressed cache for synthesized audio.
+    Tier 1: in-process LRU of cache key -> public url.
+    Tier 2: storage object named after the cache key, so audio uploaded once is reused after restarts.
+    """
+
+    def __init__(
+            self,
+            file_storage_service: FileStorageService = None,
+            maxsize: int = TTS_CACHE_MAX_ENTRIES,
+            lookup_max_chars: int = TTS_CACHE_LOOKUP_MAX_CHARS,
+            lookup_timeout: float = TTS_CACHE_LOOKUP_TIMEOUT_SECONDS):
+        self.file_storage_service = file_storage_service or FileStorageService()
+        self.memory = LRUCache(maxsize)
+        self.lookup_max_chars = lookup_max_chars
+        self.lookup_timeout = lookup_timeout
+        self.storage_hits = 0
+        self.storage_misses = 0
+        self.storage_skipped = 0
+
+    @staticmethod
+    def cache_key(text: str, voice: str = "", model: str = "", lang: str = "") -> str:
+        raw = "\x1f".join([model or "", voice or "", lang or "", text])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    async def get_or_create(
+            self,
+            text: str,
+            synthesize: Callable[[], Awaitable[bytes]],
+            voice: str = "",
+            model: str = "",
+            lang: str = "") -> str:
+        """
+        Return the audio url for text. synthesize and upload are only called on a miss in both tiers.
+        Storage is looked up only for short texts (lookup_max_chars), bounded by lookup_timeout.
+        :param text:
+        :param synthesize: coroutine function returning mp3 bytes
+        :param voice:
+        :param model:
+        :param lang:
+        :return: public audio url
+        """
+        key = self.cache_key(text, voice, model, lang)
+        url = self.memory.get(key)
+        if url:
+            return url
+
+        filename = f"{TTS_CACHE_FOLDER}/{key}.mp3"
+        if len(text) > self.lookup_max_chars:
+            self.storage_skipped += 1
+            exists = False
+        else:
+            exists = await self.file_storage_service.exists_async(filename, timeout=self.lookup_timeout)
+
+        if exists:
+            self.storage_hits += 1
+            url = self.file_storage_service.public_url(filename)
+        else:
+            self.storage_misses += 1
+            audio = await synthesize()
+            url = await self.file_storage_service.upload_bytes_async(audio, filename, upsert=True)
+
+        self.memory.set(key, url)
+        return url
+
+    def stats(self) -> dict:
+        return {
+            "memory": self.memory.stats(),
+            "storage": {"hits": self.storage_hits, "misses": self.storage_misses, "skipped": self.storage_skipped},
+        }
+
+
+tts_cache_service = TtsCacheService()
@@ -1,5 +1,3 @@
-from datetime import datetime, timedelta, timezone
-
 from fastapi import Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
@@ -11,7 +9,8 @@ from app.models.user import User
 from app.dtos.user_dto import UserCreate, SettingsUpdateRequest
 import uuid
 
-from app.service.auth_service import AuthService
+from app.service.auth_service import AuthService, invalidate_cached_user
+from app.service.otp_store import otp_store
 
 
 class UserService:
@@ -50,7 +49,7 @@ class UserService:
         user = User(
             name=request.name,
             email=request.email,
-            password=self.auth_service.hash_password(request.password)
+            password=await self.auth_service.hash_password_async(request.password)
         )
 
         db.add(user)
@@ -60,26 +59,31 @@ class UserService:
     async def authenticate(self, request: LoginRequest, db: AsyncSession = Depends(get_db)):
         user = await self.get_user_by_email(request.email, db)
 
-        if not user or not self.auth_service.verify_password(request.password, user.password):
+        if not user:
             raise InvalidCredentialException()
-
+        valid, new_hash = await self.auth_service.verify_and_update_password_async(request.password, user.password)
+        if not valid:
+            raise InvalidCredentialException()
+        if new_hash:
+            # cost factor changed since the hash was made
+            user.password = new_hash
+            db.add(user)
+            await db.commit()
+            invalidate_cached_user(user.id)
+
+        # the code lives in the OTP store, not on the user row
         otp = self.auth_service.generate_otp()
-        user.otp_code = otp
-        user.otp_expires_at = datetime.now() + timedelta(minutes=30)
-        db.add(user)
-        await db.commit()
+        await otp_store.issue(str(user.id), otp)
 
         # send email
         await self.auth_service.send_otp_email(user.email, otp)
         return str(user.id)
 
-    async def verify_otp(self, user_id: str, otp: str, db: AsyncSession = Depends(get_db)):
-        user = await self.get_user_by_id(user_id, db)
-
-        if not user or user.otp_code != otp or user.otp_expires_at < datetime.now():
+    async def verify_otp(self, user_id: str, otp: str):
+        if not await otp_store.verify(user_id, otp):
             raise InvalidCredentialException("OTP is invalid or expired.")
 
-        token = self.auth_service.create_access_token({"sub": str(user.id)})
+        token = self.auth_service.create_access_token({"sub": user_id})
         return token
 
     def get_user_preferences(self, current_user: User):
@@ -111,3 +115,4 @@ class UserService:
         db.add(user)
         await db.commit()
         await db.refresh(user)
+        invalidate_cached_user(user.id)
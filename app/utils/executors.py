@@ -0,0 +1,114 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable
+
+from dotenv import load_dotenv
+
+from app.exceptions.exceptions import ServiceBusyException
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+
+class BoundedExecutor:
+    """
+    Dedicated thread pool for one workload class with a bounded queue.
+    When max_pending calls are already running or queued, new calls are rejected with ServiceBusyException
+    instead of waiting for an unbounded time.
+    With processes=True, CPU-bound work runs in spawned worker processes instead (fn and args must be picklable).
+    A process pool that lost a worker (e.g. to the OOM killer) is replaced, the calls running on it fail.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_pending: int, processes: bool = False):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.processes = processes
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.restarts = 0
+        self._pool = self._create_pool()
+
+    def _create_pool(self) -> Executor:
+        if self.processes:
+            # spawn: forking a process with a running event loop and open sockets is unsafe
+            return ProcessPoolExecutor(
+                max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=self.name)
+
+    async def run(self, fn: Callable, *args):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise ServiceBusyException(f"{self.name} is busy. Please retry later.")
+
+        self.pending += 1
+        pool = self._pool
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(pool, fn, *args)
+        except BrokenProcessPool:
+            # a broken pool rejects every later call: replace it once, not once per failed call
+            if self._pool is pool:
+                logger.error(f"{self.name} worker process died, restarting the pool")
+                self._pool = self._create_pool()
+                self.restarts += 1
+                pool.shutdown(wait=False, cancel_futures=True)
+            raise
+        finally:
+            self.pending -= 1
+            self.completed += 1
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.max_workers,
+            "maxPending": self.max_pending,
+            "running": min(self.pending, self.max_workers),
+            "queued": max(self.pending - self.max_workers, 0),
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "restarts": self.restarts,
+        }
+
+
+gtts_executor = BoundedExecutor(
+    "gtts",
+    max_workers=int(os.getenv("GTTS_WORKERS", "4")),
+    max_pending=int(os.getenv("GTTS_MAX_PENDING", "32"))
+)
+cache_io_executor = BoundedExecutor(
+    "cache-io",
+    max_workers=int(os.getenv("CACHE_IO_WORKERS", "2")),
+    max_pending=int(os.getenv("CACHE_IO_MAX_PENDING", "256"))
+)
+audio_executor = BoundedExecutor(
+    "audio",
+    max_workers=int(os.getenv("AUDIO_WORKERS", "2")),
+    max_pending=int(os.getenv("AUDIO_MAX_PENDING", "16"))
+)
+# a single thread keeps the writes of each recording in order
+recording_executor = BoundedExecutor(
+    "recording",
+    max_workers=1,
+    max_pending=int(os.getenv("RECORDING_MAX_PENDING", "128"))
+)
+# bcrypt releases the GIL while hashing, so threads would keep the event loop responsive as well
+# (benchmarks/login_storm.py). processes isolate the hashing: a worker killed mid-storm is replaced
+# without taking the app process down
+password_executor = BoundedExecutor(
+    "password",
+    max_workers=int(os.getenv("PASSWORD_WORKERS", "2")),
+    max_pending=int(os.getenv("PASSWORD_MAX_PENDING", "64")),
+    processes=True
+)
+# one thread owns the persistent SMTP connection
+mail_executor = BoundedExecutor("mail", max_workers=1, max_pending=4)
+executors = [gtts_executor, cache_io_executor, audio_executor, recording_executor, password_executor, mail_executor]
@@ -0,0 +1,29 @@
+import base64
+import json
+import uuid
+from datetime import datetime
+
+from fastapi import HTTPException
+
+
+def encode_cursor(created_at: datetime, item_id: uuid.UUID) -> str:
+    """
+    Make an opaque keyset cursor from the last item of a page
+    :param created_at:
+    :param item_id:
+    :return: url-safe cursor string
+    """
+    raw = json.dumps([created_at.isoformat(), str(item_id)])
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, uuid.UUID]:
+    """
+    :param cursor: cursor made by encode_cursor
+    :return: (created_at, id)
+    """
+    try:
+        created_at, item_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return datetime.fromisoformat(created_at), uuid.UUID(item_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
@@ -0,0 +1,39 @@
+"""
+bcrypt hashing run in the password worker processes.
+Keep this module free of app imports: every worker process imports it on start.
+"""
+import os
+from typing import Optional, Tuple
+
+from passlib.context import CryptContext
+
+# cost factor of new hashes. each +1 doubles the time per hash
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# hashes with a cost outside this range are replaced on the next successful login
+BCRYPT_MIN_ROUNDS = int(os.getenv("BCRYPT_MIN_ROUNDS", str(BCRYPT_ROUNDS)))
+BCRYPT_MAX_ROUNDS = int(os.getenv("BCRYPT_MAX_ROUNDS", str(BCRYPT_ROUNDS)))
+
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_MIN_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_MAX_ROUNDS,
+)
+
+
+def hash_password(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def verify_password(password: str, hashed: str) -> bool:
+    return pwd_context.verify(password, hashed)
+
+
+def verify_and_update(password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    """
+    :param password: plain password
+    :param hashed: stored hash
+    :return: (valid, new hash when the stored one uses an outdated cost, else None)
+    """
+    return pwd_context.verify_and_update(password, hashed)
@@ -0,0 +1,56 @@
+import re
+from typing import List, Optional
+
+# end of sentence: Japanese punctuation, or latin punctuation followed by whitespace, or line break
+SENTENCE_BOUNDARY = re.compile(r"[。！？]+[」』）)]*|[.!?]+[\"')\]]*(?=\s)|\n+")
+
+
+class SentenceSplitter:
+    """
+    Split text into sentences incrementally.
+    Feed text chunks (e.g. streamed tokens) and get back every sentence that is complete so far.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+
+    def feed(self, text: str) -> List[str]:
+        """
+        Append text and return sentences completed by it
+        :param text:
+        :return: list of complete sentences
+        """
+        self._buffer += text
+        sentences = []
+        while True:
+            match = SENTENCE_BOUNDARY.search(self._buffer)
+            if not match:
+                break
+            sentence = self._buffer[:match.end()].strip()
+            self._buffer = self._buffer[match.end():]
+            if sentence:
+                sentences.append(sentence)
+        return sentences
+
+    def flush(self) -> Optional[str]:
+        """
+        Return the remaining text which has no sentence boundary yet
+        :return: str or None
+        """
+        rest = self._buffer.strip()
+        self._buffer = ""
+        return rest or None
+
+    @staticmethod
+    def split(text: str) -> List[str]:
+        """
+        Split whole text into sentences
+        :param text:
+        :return: list of sentences
+        """
+        splitter = SentenceSplitter()
+        sentences = splitter.feed(text)
+        rest = splitter.flush()
+        if rest:
+            sentences.append(rest)
+        return sentences
@@ -0,0 +1,59 @@
+"""
+Shared setup of the database benchmarks: a synchronous engine with the app's tables and a statement counter.
+SQLite in memory by default, any SQLAlchemy URL with a sync driver (e.g. postgresql+psycopg2://...) with --url.
+"""
+import time
+import uuid
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+DEFAULT_URL = "sqlite://"
+
+
+def create_database(url: str = DEFAULT_URL) -> Engine:
+    """
+    :param url: database to run against. its app tables are dropped and created again
+    :return: engine with empty tables
+    """
+    from app.db import Base
+    import app.models  # noqa: F401 registers the tables
+
+    # one shared connection, so an in-memory SQLite database outlives each session
+    engine = create_engine(url, poolclass=StaticPool) if url.startswith("sqlite") else create_engine(url)
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    return engine
+
+
+def create_user(engine: Engine) -> uuid.UUID:
+    from app.models import User
+
+    with Session(engine) as session:
+        user = User(id=uuid.uuid4(), email=f"{uuid.uuid4()}@example.com", name="bench")
+        session.add(user)
+        session.commit()
+        return user.id
+
+
+class StatementCounter:
+    """
+    Counts the SQL statements sent to the database.
+    round_trip_ms adds a delay per statement, like the network between the app and a remote database
+    """
+
+    def __init__(self, engine: Engine, round_trip_ms: float = 0.0):
+        self.count = 0
+        self.round_trip = round_trip_ms / 1000
+        event.listen(engine, "before_cursor_execute", self._count)
+
+    def _count(self, *args):
+        self.count += 1
+        if self.round_trip:
+            time.sleep(self.round_trip)
+
+    def reset(self) -> int:
+        count, self.count = self.count, 0
+        return count
@@ -0,0 +1,136 @@
+"""
+Loading a user's history: one message query per conversation (before) vs selectinload in HistoryService.get_history.
+
+Seeds CONVERSATIONS conversations with MESSAGES messages each, then loads the whole history
+(and the first page of PAGE conversations) REPEAT times and reports statements and latency.
+
+    python -m benchmarks.history_fetch [--conversations 200] [--messages 20] [--page 20] [--repeat 10]
+        [--round-trip-ms 0 1] [--url sqlite://]
+
+A local SQLite has no network round trip per query; --round-trip-ms adds one to show the effect of the query count.
+"""
+import argparse
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session, selectinload
+
+from benchmarks.db import DEFAULT_URL, StatementCounter, create_database, create_user
+
+
+def seed(engine, user_id: uuid.UUID, conversations: int, messages: int):
+    from app.dtos.history_dto import MessageBase
+    from app.models import Conversation, Message
+    from app.service.history_service import HistoryService
+
+    data = [
+        MessageBase(
+            role="user" if index % 2 == 0 else "assistant",
+            content=f"message {index} " + "text " * 20,
+            translatedContent=None,
+            audioUrl=None
+        ) for index in range(messages)
+    ]
+    start = datetime.now() - timedelta(days=conversations)
+    with Session(engine) as session:
+        for index in range(conversations):
+            conversation_id = uuid.uuid4()
+            created_at = start + timedelta(days=index)
+            session.add(Conversation(id=conversation_id, user_id=user_id, title=f"conversation {index}",
+                                     created_at=created_at))
+            session.flush()
+            session.execute(insert(Message), HistoryService._message_rows(data, conversation_id, created_at))
+        session.commit()
+
+
+def to_dict(conv, messages) -> dict:
+    return {
+        "conversationId": str(conv.id),
+        "title": conv.title,
+        "createdAt": conv.created_at.isoformat(),
+        "messages": [
+            {
+                "role": msg.role,
+                "content": msg.content,
+                "translatedContent": msg.translated_content,
+                "audioUrl": msg.audio_url,
+                "createdAt": msg.created_at.isoformat()
+            } for msg in messages
+        ]
+    }
+
+
+def per_conversation(session: Session, user_id: uuid.UUID, limit: int | None) -> list:
+    """The loop get_history used before: 1 + N queries"""
+    from app.models import Conversation, Message
+
+    query = select(Conversation).where(Conversation.user_id == user_id).order_by(Conversation.created_at.desc())
+    if limit is not None:
+        query = query.limit(limit)
+    history = []
+    for conv in session.execute(query).scalars().all():
+        messages = session.execute(
+            select(Message).where(Message.conversation_id == conv.id).order_by(Message.created_at)
+        ).scalars().all()
+        history.append(to_dict(conv, messages))
+    return history
+
+
+def select_in(session: Session, user_id: uuid.UUID, limit: int | None) -> list:
+    """The query of HistoryService.get_history: conversations, then the messages of all of them in one query"""
+    from app.models import Conversation
+
+    query = (
+        select(Conversation)
+        .where(Conversation.user_id == user_id)
+        .options(selectinload(Conversation.messages))
+        .order_by(Conversation.created_at.desc(), Conversation.id.desc())
+    )
+    if limit is not None:
+        query = query.limit(limit)
+    return [to_dict(conv, conv.messages) for conv in session.execute(query).scalars().all()]
+
+
+def main(args):
+    engine = create_database(args.url)
+    user_id = create_user(engine)
+    seed(engine, user_id, args.conversations, args.messages)
+    counter = StatementCounter(engine)
+
+    print(f"{engine.dialect.name}, {args.conversations} conversations x {args.messages} messages, "
+          f"median of {args.repeat} runs")
+    print(f"{'round trip':<12}{'load':<10}{'mode':<18}{'statements':>12}{'ms':>10}")
+    cases = [
+        (round_trip_ms, load, limit, mode, fetch)
+        for round_trip_ms in args.round_trip_ms
+        for load, limit in (("all", None), (f"page {args.page}", args.page))
+        for mode, fetch in (("per-conversation", per_conversation), ("selectinload", select_in))
+    ]
+    for round_trip_ms, load, limit, mode, fetch in cases:
+        counter.round_trip = round_trip_ms / 1000
+        times = []
+        statements = 0
+        for _ in range(args.repeat):
+            with Session(engine) as session:
+                counter.reset()
+                start = time.perf_counter()
+                history = fetch(session, user_id, limit)
+                times.append(time.perf_counter() - start)
+                statements = counter.reset()
+        assert len(history) == (limit or args.conversations)
+        print(f"{round_trip_ms:<12g}{load:<10}{mode:<18}{statements:>12}{statistics.median(times) * 1000:>10.1f}")
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--conversations", type=int, default=200)
+    parser.add_argument("--messages", type=int, default=20)
+    parser.add_argument("--page", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--round-trip-ms", type=float, nargs="+", default=[0, 1])
+    parser.add_argument("--url", default=DEFAULT_URL)
+    main(parser.parse_args())
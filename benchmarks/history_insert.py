@@ -0,0 +1,98 @@
+"""
+Saving messages: one ORM object per message (before) vs the bulk inserts of HistoryService.
+
+- orm: session.add per message
+- values: one insert().values([...]) statement, as used to save a new conversation in one round trip
+- bulk: executemany, as used by save_messages
+
+Appends 10, 100 and 1000 messages to a conversation REPEAT times each and reports statements and latency.
+
+    python -m benchmarks.history_insert [--sizes 10 100 1000] [--repeat 20] [--url sqlite://]
+"""
+import argparse
+import statistics
+import time
+import uuid
+from datetime import datetime
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from benchmarks.db import DEFAULT_URL, StatementCounter, create_database, create_user
+
+
+def orm_add(session: Session, data: list, conversation_id: uuid.UUID):
+    from app.models import Message
+
+    for m in data:
+        session.add(Message(
+            id=uuid.uuid4(),
+            conversation_id=conversation_id,
+            role=m.role,
+            content=m.content,
+            translated_content=m.translatedContent,
+            audio_url=m.audioUrl,
+            created_at=datetime.now()
+        ))
+    session.commit()
+
+
+def values_insert(session: Session, data: list, conversation_id: uuid.UUID):
+    from app.models import Message
+    from app.service.history_service import HistoryService
+
+    session.execute(insert(Message).values(HistoryService._message_rows(data, conversation_id, datetime.now())))
+    session.commit()
+
+
+def bulk_insert(session: Session, data: list, conversation_id: uuid.UUID):
+    from app.models import Message
+    from app.service.history_service import HistoryService
+
+    session.execute(insert(Message), HistoryService._message_rows(data, conversation_id, datetime.now()))
+    session.commit()
+
+
+def main(args):
+    from app.dtos.history_dto import MessageBase
+    from app.models import Conversation
+
+    engine = create_database(args.url)
+    counter = StatementCounter(engine)
+    user_id = create_user(engine)
+
+    print(f"{engine.dialect.name}, median of {args.repeat} runs")
+    print(f"{'messages':<10}{'mode':<8}{'statements':>12}{'ms':>10}{'msgs/s':>10}")
+    for size in args.sizes:
+        data = [
+            MessageBase(
+                role="user" if index % 2 == 0 else "assistant",
+                content=f"message {index} " + "text " * 20,
+                translatedContent=None,
+                audioUrl=None
+            ) for index in range(size)
+        ]
+        for mode, save in (("orm", orm_add), ("values", values_insert), ("bulk", bulk_insert)):
+            times = []
+            statements = 0
+            for _ in range(args.repeat):
+                with Session(engine) as session:
+                    conversation_id = uuid.uuid4()
+                    session.add(Conversation(id=conversation_id, user_id=user_id, title="bench"))
+                    session.commit()
+                    counter.reset()
+                    start = time.perf_counter()
+                    save(session, data, conversation_id)
+                    times.append(time.perf_counter() - start)
+                    statements = counter.reset()
+            elapsed = statistics.median(times)
+            print(f"{size:<10}{mode:<8}{statements:>12}{elapsed * 1000:>10.2f}{size / elapsed:>10.0f}")
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--url", default=DEFAULT_URL)
+    main(parser.parse_args())
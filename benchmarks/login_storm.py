@@ -0,0 +1,93 @@
+"""
+Event loop lag during a login storm.
+
+Runs CONCURRENCY bcrypt verifications at a time (LOGINS in total) while a probe task measures
+how late the event loop wakes it up. Compares hashing on the loop itself, in a thread pool
+and in the password worker processes (password_executor).
+
+    python -m benchmarks.login_storm [--logins 64] [--concurrency 16] [--rounds 12]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+PROBE_INTERVAL = 0.005
+
+
+async def probe(lags: list[float], stop: asyncio.Event):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(PROBE_INTERVAL)
+        lags.append(time.perf_counter() - start - PROBE_INTERVAL)
+
+
+async def storm(mode: str, logins: int, concurrency: int, hashed: str) -> dict:
+    from app.utils import password_utils
+    from app.utils.executors import BoundedExecutor, password_executor
+
+    threads = BoundedExecutor("bench-threads", max_workers=password_executor.max_workers, max_pending=logins)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def login():
+        async with semaphore:
+            if mode == "inline":
+                password_utils.verify_and_update("password", hashed)
+                # let the probe run between logins, like separate requests would
+                await asyncio.sleep(0)
+            elif mode == "threads":
+                await threads.run(password_utils.verify_and_update, "password", hashed)
+            else:
+                await password_executor.run(password_utils.verify_and_update, "password", hashed)
+
+    lags: list[float] = []
+    stop = asyncio.Event()
+    probe_task = asyncio.create_task(probe(lags, stop))
+    start = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await probe_task
+    threads.shutdown()
+
+    lags_ms = sorted(lag * 1000 for lag in lags)
+    return {
+        "mode": mode,
+        "loginsPerSec": logins / elapsed,
+        "lagP50Ms": statistics.median(lags_ms),
+        "lagP99Ms": lags_ms[int(len(lags_ms) * 0.99)],
+        "lagMaxMs": lags_ms[-1],
+    }
+
+
+async def main(args):
+    from app.utils import password_utils
+    from app.utils.executors import password_executor
+
+    hashed = password_utils.hash_password("password")
+    # start the worker processes outside the measurement
+    await asyncio.gather(*(
+        password_executor.run(password_utils.verify_password, "password", hashed)
+        for _ in range(password_executor.max_workers)
+    ))
+
+    print(f"{args.logins} logins, {args.concurrency} concurrent, bcrypt rounds {args.rounds}, "
+          f"{password_executor.max_workers} workers")
+    print(f"{'mode':<10}{'logins/s':>10}{'lag p50 ms':>12}{'lag p99 ms':>12}{'lag max ms':>12}")
+    for mode in ("inline", "threads", "processes"):
+        result = await storm(mode, args.logins, args.concurrency, hashed)
+        print(f"{result['mode']:<10}{result['loginsPerSec']:>10.1f}{result['lagP50Ms']:>12.1f}"
+              f"{result['lagP99Ms']:>12.1f}{result['lagMaxMs']:>12.1f}")
+    password_executor.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--logins", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--rounds", type=int, default=12)
+    args = parser.parse_args()
+    # read by password_utils on import, also in the worker processes
+    os.environ["BCRYPT_ROUNDS"] = str(args.rounds)
+    asyncio.run(main(args))
@@ -0,0 +1,145 @@
+"""
+Relay throughput and added latency through /ws/echo (the realtime relay with a loopback upstream).
+
+Starts the app with uvicorn once per REALTIME_COALESCE_MS value and sends fake PCM16 audio frames:
+- burst: FRAMES frames as fast as possible -> frames/sec and upstream messages/sec
+- paced: one frame every FRAME_MS like a microphone -> latency from send to echo
+
+    python -m benchmarks.realtime_echo [--coalesce 0 20 40] [--frames 2000] [--paced-frames 250]
+
+The app settings (DATABASE_URL etc.) come from the environment or .env as usual; nothing is called upstream.
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import struct
+import subprocess
+import sys
+import time
+
+import websockets
+
+SAMPLE_RATE = 16000
+FRAME_MS = 20
+FRAME_BYTES = SAMPLE_RATE * FRAME_MS // 1000 * 2
+# quiet time after which frames that did not come back are counted as dropped
+RECEIVE_IDLE_SECONDS = 1.0
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def make_frame(index: int) -> bytes:
+    # send time and index in the header of each frame, so frames can be told apart after merging
+    header = struct.pack("<dI", time.perf_counter(), index)
+    return header + bytes(FRAME_BYTES - len(header))
+
+
+async def receive_frames(ws, expected: int, latencies: list[float] | None = None) -> tuple[int, int]:
+    """
+    :return: (messages received, frames received)
+    """
+    messages = 0
+    frames = 0
+    while frames < expected:
+        try:
+            message = await asyncio.wait_for(ws.recv(), RECEIVE_IDLE_SECONDS)
+        except asyncio.TimeoutError:
+            break
+        now = time.perf_counter()
+        messages += 1
+        for offset in range(0, len(message), FRAME_BYTES):
+            frames += 1
+            if latencies is not None:
+                sent_at, _ = struct.unpack_from("<dI", message, offset)
+                latencies.append(now - sent_at)
+    return messages, frames
+
+
+async def burst(url: str, count: int) -> dict:
+    async with websockets.connect(url, max_size=None) as ws:
+        receiver = asyncio.create_task(receive_frames(ws, count))
+        start = time.perf_counter()
+        for index in range(count):
+            await ws.send(make_frame(index))
+        messages, frames = await receiver
+        elapsed = time.perf_counter() - start - (RECEIVE_IDLE_SECONDS if frames < count else 0)
+    return {
+        "framesPerSec": frames / elapsed,
+        "messagesPerSec": messages / elapsed,
+        "dropped": count - frames,
+    }
+
+
+async def paced(url: str, count: int) -> dict:
+    latencies: list[float] = []
+    async with websockets.connect(url, max_size=None) as ws:
+        receiver = asyncio.create_task(receive_frames(ws, count, latencies))
+        start = time.perf_counter()
+        for index in range(count):
+            await asyncio.sleep(max(start + index * FRAME_MS / 1000 - time.perf_counter(), 0))
+            await ws.send(make_frame(index))
+        messages, _ = await receiver
+    latencies_ms = sorted(latency * 1000 for latency in latencies)
+    return {
+        "messages": messages,
+        "latencyP50Ms": statistics.median(latencies_ms),
+        "latencyP99Ms": latencies_ms[int(len(latencies_ms) * 0.99)],
+    }
+
+
+async def wait_ready(url: str, server: subprocess.Popen, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while True:
+        if server.poll() is not None:
+            raise RuntimeError("app exited on start")
+        try:
+            async with websockets.connect(url):
+                return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.2)
+
+
+async def measure(coalesce_ms: float, args) -> tuple[dict, dict]:
+    port = free_port()
+    url = f"ws://127.0.0.1:{port}/ws/echo"
+    env = {**os.environ, "REALTIME_COALESCE_MS": str(coalesce_ms)}
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    try:
+        await wait_ready(url, server)
+        return await burst(url, args.frames), await paced(url, args.paced_frames)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+async def main(args):
+    print(f"{FRAME_BYTES} byte frames ({FRAME_MS} ms of {SAMPLE_RATE} Hz PCM16), "
+          f"burst {args.frames} frames, paced {args.paced_frames} frames")
+    print(f"{'coalesce ms':<12}{'frames/s':>10}{'msgs/s':>10}{'dropped':>9}"
+          f"{'paced msgs':>12}{'p50 ms':>8}{'p99 ms':>8}")
+    for coalesce_ms in args.coalesce:
+        burst_result, paced_result = await measure(coalesce_ms, args)
+        print(f"{coalesce_ms:<12g}{burst_result['framesPerSec']:>10.0f}{burst_result['messagesPerSec']:>10.0f}"
+              f"{burst_result['dropped']:>9}{paced_result['messages']:>12}"
+              f"{paced_result['latencyP50Ms']:>8.1f}{paced_result['latencyP99Ms']:>8.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--coalesce", type=float, nargs="+", default=[0, 20, 40])
+    parser.add_argument("--frames", type=int, default=2000)
+    parser.add_argument("--paced-frames", type=int, default=250)
+    asyncio.run(main(parser.parse_args()))